@@ -1,25 +1,100 @@
 import os
-import dash
-from dash import Dash, html, dcc
+
+from data import startup
+
+with startup.timed('import dash'):
+    import dash
+    from dash import Dash, html, dcc
+    from flask import g, jsonify, request
+
+    from data import client, export, fastjson, metrics, warmer
+    from data.parallel import UPSTREAM_FETCH_DEADLINE
 
 # Get the base path from the environment variable (default to '/'). ex: /dashboard/
 requests_pathname_prefix = os.getenv('REQUESTS_PATHNAME_PREFIX', '/')
 routes_pathname_prefix = os.getenv('ROUTES_PATHNAME_PREFIX', '/')
 
-app = Dash(__name__, use_pages=True, serve_locally=False, requests_pathname_prefix=requests_pathname_prefix, routes_pathname_prefix=routes_pathname_prefix,)
+# Compress callback responses (_dash-update-component) and other text responses
+DASH_COMPRESS = os.getenv('DASH_COMPRESS', 'false').lower() in ('1', 'true', 'yes')
+COMPRESS_ALGORITHM = os.getenv('COMPRESS_ALGORITHM', 'br,gzip')
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+# Seconds of upstream time a callback may use, shared by sign-in and every fetch it starts
+UPSTREAM_CALLBACK_BUDGET = float(os.getenv('UPSTREAM_CALLBACK_BUDGET', str(UPSTREAM_FETCH_DEADLINE)))
+# Serve the Dash component bundles from this app (or nginx, see collect_static.py) instead of the CDN
+DASH_SERVE_LOCALLY = os.getenv('DASH_SERVE_LOCALLY', 'false').lower() in ('1', 'true', 'yes')
+
+# Serialize callback responses with orjson when it is installed
+fastjson.configure_plotly()
+
+# Creating the app also imports and registers the pages
+with startup.timed('create app and pages'):
+    app = Dash(__name__, use_pages=True, serve_locally=DASH_SERVE_LOCALLY, requests_pathname_prefix=requests_pathname_prefix, routes_pathname_prefix=routes_pathname_prefix,)
 
 server = app.server
 
-app.layout = html.Div([
-    html.Div([
-        html.Span(
-            dcc.Link(f"{page['name']}", href=page["relative_path"]),
-            style={'display': 'none', 'margin': '0 10px'}  # Inline style with margin between links
-        )
-        for page in dash.page_registry.values()
-    ]),
-    dash.page_container
-])
+# Callback timings and the Prometheus /metrics route; installed before compression so sizes are as sent
+metrics.install(server, routes_pathname_prefix)
+
+# Streaming CSV/Parquet exports of the consumption rows shown on the NIT page
+export.install(server, routes_pathname_prefix)
+
+if DASH_COMPRESS:
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        print("DASH_COMPRESS is set but flask-compress is not installed; responses are sent uncompressed")
+    else:
+        # Configured here rather than with Dash(compress=True), which forces gzip only
+        server.config['COMPRESS_ALGORITHM'] = [algorithm.strip() for algorithm in COMPRESS_ALGORITHM.split(',')]
+        server.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript']
+        server.config['COMPRESS_MIN_SIZE'] = COMPRESS_MIN_SIZE
+        Compress(server)
+
+# Bound the upstream time of each callback so a hung upstream cannot pin the worker
+@server.before_request
+def start_upstream_budget():
+    if request.path == f"{routes_pathname_prefix}_dash-update-component":
+        g.upstream_budget = client.set_deadline(UPSTREAM_CALLBACK_BUDGET)
+
+@server.teardown_request
+def end_upstream_budget(exc):
+    token = g.pop('upstream_budget', None)
+    if token is not None:
+        client.reset_deadline(token)
+
+# Connection pool counters and circuit breaker states of the worker that serves the request
+@server.route(f"{routes_pathname_prefix}_upstream-stats")
+def upstream_stats():
+    return jsonify({**client.pool_stats(), 'breakers': client.breaker_states()})
+
+# Import and init breakdown of the worker that serves the request
+@server.route(f"{routes_pathname_prefix}_startup")
+def startup_report():
+    return jsonify(startup.report())
+
+# Readiness of the warm cache: 503 until the configured WARM_NITS have been loaded
+@server.route(f"{routes_pathname_prefix}_ready")
+def ready():
+    readiness = warmer.readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
+with startup.timed('build layout'):
+    app.layout = html.Div([
+        html.Div([
+            html.Span(
+                dcc.Link(f"{page['name']}", href=page["relative_path"]),
+                style={'display': 'none', 'margin': '0 10px'}  # Inline style with margin between links
+            )
+            for page in dash.page_registry.values()
+        ]),
+        dash.page_container
+    ])
+
+startup.log_report()
+# Optional background warm-up; startup itself never touches the upstream API
+startup.start_warm_up()
+# Keep recently viewed NITs warm in the shared cache
+warmer.start()
 
 # Run the app
 if __name__ == '__main__':
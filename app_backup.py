@@ -14,7 +14,7 @@ app = Dash()
 server = app.server
 
 # Load JSON data
-json_data = report.consumptions_by_nit.json()
+json_data = report.get_consumptions_by_nit('1012402467')
 
 data = []
 for entry in json_data:
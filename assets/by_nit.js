@@ -0,0 +1,192 @@
+// Clientside rendering for pages/by_nit.py (enabled with CLIENTSIDE_RENDERING=true).
+// The dataset stored in 'consumption-store' holds the long (status, dimension, key, count)
+// table built by data/model.py, so status changes and KPI tiles are computed in the
+// browser without server requests.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    by_nit: (function () {
+        var MONTHS = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+                      'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'];
+        var DIMENSIONS = ['tipoCreacion', 'tipoProceso', 'tipoAutenticacion', 'consolidados'];
+
+        // Rebuild one record per status ({processStatus, totalConsolidado, <dimension>: {key: count}})
+        // from the dictionary-encoded columns of data.model.encode_consumption()
+        function recordsFromTable(table) {
+            if (!table) { return []; }
+            var records = table.statuses.map(function (status) {
+                var record = {processStatus: status, totalConsolidado: 0};
+                DIMENSIONS.forEach(function (d) { record[d] = {}; });
+                return record;
+            });
+            for (var i = 0; i < table.count.length; i++) {
+                var record = records[table.status[i]];
+                var dimension = DIMENSIONS[table.dimension[i]];
+                record[dimension][table.keys[table.key[i]]] = table.count[i];
+                if (dimension === 'consolidados') { record.totalConsolidado += table.count[i]; }
+            }
+            return records;
+        }
+
+        function sumValues(obj) {
+            return Object.values(obj || {}).reduce(function (a, b) { return a + b; }, 0);
+        }
+
+        function tile(label, value) {
+            return {
+                type: 'Div', namespace: 'dash_html_components',
+                props: {children: [
+                    {type: 'Span', namespace: 'dash_html_components', props: {children: label}},
+                    {type: 'H3', namespace: 'dash_html_components', props: {children: String(value)}}
+                ]}
+            };
+        }
+
+        function layout(template, title, extra) {
+            return Object.assign({template: template, title: {text: title}}, extra || {});
+        }
+
+        function emptyFigure(template, title) {
+            return {data: [], layout: layout(template, title)};
+        }
+
+        function findRecord(records, status) {
+            for (var i = 0; i < records.length; i++) {
+                if (records[i].processStatus === status) { return records[i]; }
+            }
+            return null;
+        }
+
+        // One trace per category, like plotly.express does with color=<column>
+        function coloredBars(names, values, orientation) {
+            return names.map(function (name, i) {
+                var trace = {type: 'bar', name: name, legendgroup: name, showlegend: true,
+                             orientation: orientation, text: [values[i]], textposition: 'inside'};
+                if (orientation === 'h') {
+                    trace.x = [values[i]]; trace.y = [name];
+                } else {
+                    trace.x = [name]; trace.y = [values[i]];
+                }
+                return trace;
+            });
+        }
+
+        function donut(template, record, field, title, status) {
+            if (!record) {
+                return {data: [{type: 'pie', labels: ['No Data Available'], values: [1], hole: 0.4}],
+                        layout: layout(template, 'Tipo Creacion for Status: ' + status)};
+            }
+            var breakdown = record[field] || {};
+            var fig = {data: [{type: 'pie', labels: Object.keys(breakdown), values: Object.values(breakdown), hole: 0.4}],
+                       layout: layout(template, title)};
+            if (sumValues(breakdown) === 0) {
+                fig.layout.annotations = [{
+                    text: 'No hay resultados para ' + status,
+                    font: {family: 'Arial, sans-serif', size: 18, color: '#000'},
+                    align: 'center', xref: 'paper', yref: 'paper', x: 0.1, y: 0.5, showarrow: false
+                }];
+            }
+            return fig;
+        }
+
+        function consolidated(template, record) {
+            var months = Object.keys(record.consolidados || {});
+            var labels = months.map(function (m) {
+                return MONTHS[parseInt(m.slice(4, 6), 10) - 1] + ' ' + m.slice(0, 4);
+            });
+            var counts = months.map(function (m) { return record.consolidados[m]; });
+            return {
+                data: [{type: 'scatter', mode: 'lines+markers+text', x: labels, y: counts,
+                        text: counts, textposition: 'middle left'}],
+                layout: layout(template, 'Procesos por mes', {
+                    xaxis: {title: {text: 'Mes'}}, yaxis: {title: {text: 'Total mes'}}
+                })
+            };
+        }
+
+        function statusTotals(template, records, status) {
+            var rows = records.filter(function (r) { return r.processStatus !== 'TODOS'; });
+            if (status.toLowerCase() !== 'todos') {
+                rows = rows.filter(function (r) { return r.processStatus === status; });
+            }
+            return {
+                data: coloredBars(rows.map(function (r) { return r.processStatus; }),
+                                  rows.map(function (r) { return r.totalConsolidado; }), 'h'),
+                layout: layout(template, 'Procesos por estado', {
+                    barmode: 'relative',
+                    xaxis: {title: {text: 'Total Consolidado'}},
+                    yaxis: {title: {text: 'Estado'}},
+                    legend: {title: {text: 'Estado'}}
+                })
+            };
+        }
+
+        function authMethods(template, record) {
+            var breakdown = record.tipoAutenticacion || {};
+            return {
+                data: coloredBars(Object.keys(breakdown), Object.values(breakdown), 'v'),
+                layout: layout(template, 'Firmas por tipo de Autenticación', {
+                    barmode: 'relative',
+                    xaxis: {title: {text: 'Tipo Autenticacion'}},
+                    yaxis: {title: {text: 'Total'}},
+                    legend: {title: {text: 'Tipo Autenticacion'}}
+                })
+            };
+        }
+
+        return {
+            status_options: function (dataset, currentStatus) {
+                if (!dataset || !dataset.table || !dataset.table.statuses.length) {
+                    return [[], null];
+                }
+                var statuses = dataset.table.statuses;
+                var options = statuses.map(function (s) { return {label: s, value: s}; });
+                if (statuses.indexOf(currentStatus) !== -1) {
+                    return [options, currentStatus];
+                }
+                return [options, statuses.length > 4 ? statuses[4] : statuses[0]];
+            },
+
+            totals: function (dataset) {
+                var records = recordsFromTable(dataset && dataset.table);
+                var signatures = 0, processes = 0, signed = 0;
+                records.forEach(function (r) {
+                    var created = (r.tipoCreacion.BackOffice || 0) + (r.tipoCreacion.API || 0);
+                    if (r.processStatus !== 'Borrador') {
+                        signatures += sumValues(r.tipoAutenticacion);
+                        processes += created;
+                    }
+                    if (r.processStatus === 'Exitoso') {
+                        signed += created;
+                    }
+                });
+                return [tile('Total de firmas', signatures),
+                        tile('Total de procesos', processes),
+                        tile('Total de procesos finalizados', signed)];
+            },
+
+            figures: function (dataset, status, template) {
+                if (!dataset) {
+                    // Read when called: this file loads before dash_renderer defines no_update
+                    var noUpdate = window.dash_clientside.no_update;
+                    return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                }
+                var records = recordsFromTable(dataset.table);
+                var record = status ? findRecord(records, status) : null;
+                if (!record) {
+                    var empty = emptyFigure(template, 'Error: Failed to fetch data');
+                    return [empty, empty, empty, empty, empty];
+                }
+                return [
+                    consolidated(template, record),
+                    statusTotals(template, records, status),
+                    donut(template, record, 'tipoProceso', 'Procesos por tipo de proceso', status),
+                    donut(template, record, 'tipoCreacion', 'Procesos por tipo de creación', status),
+                    authMethods(template, record)
+                ];
+            },
+
+            first_page: function () {
+                return 0;
+            }
+        };
+    })()
+});
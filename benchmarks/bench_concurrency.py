@@ -0,0 +1,95 @@
+"""Checks that the upstream budget and concurrency bounds hold under stalled or busy upstreams.
+
+These are plain tests rather than benchmarks; they run with the rest of the suite:
+
+    pytest benchmarks --benchmark-disable
+"""
+import threading
+import time
+
+from data import client
+from data.auth import TokenManager
+from data.coalesce import SingleFlight
+
+
+def _stalled(started, release):
+    def fn():
+        started.set()
+        release.wait(10)
+        return 'late'
+    return fn
+
+
+def test_single_flight_follower_stops_at_deadline():
+    flight = SingleFlight(ttl=0)
+    started, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=flight.do, args=('key', _stalled(started, release)))
+    leader.start()
+    started.wait(5)
+
+    began = time.monotonic()
+    with client.deadline(0.2):
+        assert flight.do('key', lambda: 'not run') is None
+    assert time.monotonic() - began < 1
+
+    release.set()
+    leader.join()
+
+
+def test_sign_in_follower_stops_at_deadline(monkeypatch):
+    manager = TokenManager('http://upstream.invalid/api/v1/Auth/SignIn', 'user', 'secret')
+    started, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(manager, '_sign_in', _stalled(started, release))
+    leader = threading.Thread(target=manager.get_token)
+    leader.start()
+    started.wait(5)
+
+    began = time.monotonic()
+    with client.deadline(0.2):
+        assert manager.get_token() is None
+    assert time.monotonic() - began < 1
+
+    release.set()
+    leader.join()
+
+
+class _NoCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def keys(self, prefix):
+        return []
+
+
+def test_warmer_bounds_month_slices(monkeypatch):
+    from data import consumption, warmer
+
+    lock = threading.Lock()
+    calls = {'running': 0, 'peak': 0, 'total': 0}
+
+    def fetch(nit, user_id, initial_date, final_date):
+        with lock:
+            calls['running'] += 1
+            calls['total'] += 1
+            calls['peak'] = max(calls['peak'], calls['running'])
+        time.sleep(0.05)
+        with lock:
+            calls['running'] -= 1
+        return []
+
+    monkeypatch.setattr(consumption, '_fetch_consumption_by_nit', fetch)
+    monkeypatch.setattr(consumption, 'shared_cache', _NoCache())
+    monkeypatch.setattr(consumption, 'HISTORY_STORE', False)
+    monkeypatch.setattr(warmer, 'shared_cache', _NoCache())
+    monkeypatch.setattr(warmer, 'get_users_by_nit', lambda nit, refresh=False: [])
+    monkeypatch.setattr(warmer, 'WARM_NITS', [str(900000 + index) for index in range(8)])
+    # A 60-day window spans at least three month slices per NIT
+    monkeypatch.setattr(warmer, 'default_date_range', lambda: ('2024-01-15', '2024-03-15'))
+
+    loaded, failed = warmer.warm_once()
+    assert failed == 0
+    assert calls['total'] == 8 * 3
+    assert calls['peak'] <= warmer.WARMER_MAX_PARALLEL
@@ -0,0 +1,71 @@
+"""Benchmarks of the NIT page data path at small, medium and huge tenant sizes.
+
+Run from the repository root (see benchmarks/pytest.ini for the stored baselines):
+
+    pytest benchmarks --benchmark-compare
+"""
+import pytest
+
+from benchmarks import synthetic
+from data.figures import create_figure_from_data
+from data.fleet import FleetRollup
+from data.history import HistoryStore
+from data.model import build_data_from_api, get_total_processes, get_total_processes_signed, get_total_signatures
+
+SIZES = list(synthetic.SIZES)
+FIGURE_METRICS = ['consolidated', 'status_totals', 'process_type', 'creation_type', 'auth_method']
+
+
+@pytest.fixture(scope='module', params=SIZES)
+def payload(request):
+    statuses, months, process_types, _ = synthetic.SIZES[request.param]
+    return synthetic.consumption_by_nit(statuses, months, process_types)
+
+
+@pytest.fixture(scope='module')
+def table(payload):
+    return build_data_from_api(payload)
+
+
+def test_build_data_from_api(benchmark, payload):
+    benchmark(build_data_from_api, payload)
+
+
+@pytest.mark.parametrize('total', [get_total_processes, get_total_processes_signed, get_total_signatures], ids=lambda fn: fn.__name__)
+def test_get_total(benchmark, table, total):
+    benchmark(total, table)
+
+
+@pytest.mark.parametrize('metric', FIGURE_METRICS)
+def test_create_figure_from_data(benchmark, table, metric):
+    # Bypass the figure cache: this is the cost of a first view
+    benchmark(create_figure_from_data.__wrapped__, table, 'TODOS', metric)
+
+
+def test_create_figure_from_data_cached(benchmark, table):
+    create_figure_from_data(table, 'TODOS', 'consolidated')
+    benchmark(create_figure_from_data, table, 'TODOS', 'consolidated')
+
+
+@pytest.mark.parametrize('nits', [1000, 20000])
+def test_fleet_rollup(benchmark, nits):
+    payload = synthetic.all_consumption(nits)
+
+    def aggregate():
+        rollup = FleetRollup(20)
+        for entry in payload:
+            rollup.add(entry)
+        return rollup.to_json()
+
+    benchmark(aggregate)
+
+
+@pytest.mark.parametrize('months', [12, 36])
+def test_history_load(benchmark, tmp_path, months):
+    statuses, _, process_types, _ = synthetic.SIZES['huge']
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    stored = [(2021 + index // 12) * 100 + index % 12 + 1 for index in range(months)]
+    for seed, month in enumerate(stored):
+        store.save_month('900123', 0, month, synthetic.consumption_by_nit(statuses, 1, process_types, seed=seed, month_list=[str(month)]))
+
+    benchmark(store.load, '900123', 0, stored)
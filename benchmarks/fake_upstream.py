@@ -0,0 +1,130 @@
+"""Local stand-in for the upstream Auth, Balance and Company API.
+
+Serves synthetic payloads of a configurable size with configurable latency, so the
+dashboard can be profiled and load tested without the real upstream:
+
+    python -m benchmarks.fake_upstream --size huge --latency 0.2 --port 5050
+    DEVURL=http://127.0.0.1:5050 gunicorn -b 0.0.0.0:8080 app:server -w 4
+
+Every option can also be given as an environment variable (FAKE_SIZE, FAKE_LATENCY, ...).
+Request counts per endpoint are available at /_fake/stats.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import date
+
+from flask import Flask, jsonify, request
+
+from benchmarks import synthetic
+
+
+class FakeUpstream:
+    """Flask app answering the upstream endpoints the dashboard calls."""
+
+    def __init__(self, statuses=6, process_types=3, users=10, nits=1000, methods=6, latency=0.0, jitter=0.0, token_ttl=3600):
+        self.statuses = statuses
+        self.process_types = process_types
+        self.users = users
+        self.nits = nits
+        self.methods = methods
+        self.latency = latency
+        self.jitter = jitter
+        self.token_ttl = token_ttl
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self.app = self._create_app()
+
+    @classmethod
+    def from_size(cls, size, **overrides):
+        statuses, _, process_types, users = synthetic.SIZES[size]
+        return cls(statuses=statuses, process_types=process_types, users=users, **overrides)
+
+    def _hit(self, endpoint):
+        with self._lock:
+            self.counts[endpoint] += 1
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def _create_app(self):
+        app = Flask(__name__)
+
+        @app.post('/api/v1/Auth/SignIn')
+        def sign_in():
+            self._hit('sign_in')
+            return jsonify(access_token=f'fake-{time.time():.0f}', expires_in=self.token_ttl)
+
+        @app.get('/api/v1/Balance/get-all-consumption-by-nit')
+        def consumption_by_nit():
+            self._hit('consumption_by_nit')
+            args = request.args
+            initial_date = date.fromisoformat(args['initial_date'])
+            final_date = date.fromisoformat(args['final_date'])
+            # The same query always returns the same numbers
+            seed = zlib.crc32(f"{args.get('nit')}:{args.get('userAppId', 0)}:{initial_date}:{final_date}".encode())
+            return jsonify(synthetic.consumption_by_nit(self.statuses, process_types=self.process_types, seed=seed, month_list=months_between(initial_date, final_date)))
+
+        @app.get('/api/v1/Balance/get-all-consumption')
+        def all_consumption():
+            self._hit('all_consumption')
+            seed = zlib.crc32(f"{request.args.get('initial_date')}:{request.args.get('final_date')}".encode())
+            return jsonify(synthetic.all_consumption(self.nits, self.methods, seed=seed))
+
+        @app.get('/api/v1/Company/GetAllUsersByNit/<nit>')
+        def users_by_nit(nit):
+            self._hit('users_by_nit')
+            return jsonify(synthetic.users_by_nit(self.users))
+
+        @app.get('/_fake/stats')
+        def stats():
+            with self._lock:
+                return jsonify(dict(self.counts))
+
+        return app
+
+    def serve_in_thread(self, host='127.0.0.1', port=0):
+        """Serve from a daemon thread; return the base URL to use as DEVURL."""
+        from werkzeug.serving import make_server
+
+        server = make_server(host, port, self.app, threaded=True)
+        threading.Thread(target=server.serve_forever, name='fake-upstream', daemon=True).start()
+        return f'http://{host}:{server.server_port}'
+
+
+def months_between(initial_date, final_date):
+    """Return the 'YYYYMM' keys of the months touched by [initial_date, final_date]."""
+    months = []
+    year, month = initial_date.year, initial_date.month
+    while (year, month) <= (final_date.year, final_date.month):
+        months.append(f'{year}{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=synthetic.SIZES, default=os.getenv('FAKE_SIZE', 'medium'), help='tenant size preset')
+    parser.add_argument('--statuses', type=int, default=os.getenv('FAKE_STATUSES'), help='process statuses per NIT')
+    parser.add_argument('--process-types', type=int, default=os.getenv('FAKE_PROCESS_TYPES'), help='process types per status')
+    parser.add_argument('--users', type=int, default=os.getenv('FAKE_USERS'), help='users per NIT')
+    parser.add_argument('--nits', type=int, default=int(os.getenv('FAKE_NITS', '1000')), help='NITs in get-all-consumption')
+    parser.add_argument('--latency', type=float, default=float(os.getenv('FAKE_LATENCY', '0')), help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=float(os.getenv('FAKE_JITTER', '0')), help='random +/- seconds added to the latency')
+    parser.add_argument('--host', default=os.getenv('FAKE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('FAKE_PORT', '5050')))
+    args = parser.parse_args()
+
+    overrides = {name: getattr(args, name) for name in ('statuses', 'process_types', 'users') if getattr(args, name) is not None}
+    upstream = FakeUpstream.from_size(args.size, nits=args.nits, latency=args.latency, jitter=args.jitter)
+    for name, value in overrides.items():
+        setattr(upstream, name, int(value))
+
+    upstream.app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
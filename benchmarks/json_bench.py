@@ -0,0 +1,78 @@
+"""Micro-benchmark of the fast JSON path and of callback response compression.
+
+Compares, per tenant size, the standard json module with orjson for parsing upstream
+payloads and for serializing the by_nit figures callback response, and reports the
+bytes and milliseconds of gzip/brotli compression as configured in app.py.
+
+Run from the repository root:
+
+    python -m benchmarks.json_bench
+"""
+import gzip
+import json
+import timeit
+
+from benchmarks import synthetic
+from data import fastjson
+from data.figures import create_figure_from_data
+from data.model import build_data_from_api
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FIGURE_METRICS = ['consolidated', 'status_totals', 'process_type', 'creation_type', 'auth_method']
+
+
+def best_ms(fn, number=5, repeat=5):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1000
+
+
+def bench_parsing():
+    print('Upstream parsing')
+    print(f"{'payload':<28}{'bytes':>12}{'json ms':>10}{'orjson ms':>11}{'saved ms':>10}")
+    payloads = {
+        'consumption-by-nit (huge)': synthetic.consumption_by_nit(*synthetic.SIZES['huge'][:3]),
+        'all-consumption (20k nits)': synthetic.all_consumption(nits=20000),
+        'users (20k)': synthetic.users_by_nit(users=20000),
+    }
+    for name, payload in payloads.items():
+        body = json.dumps(payload).encode()
+        json_ms = best_ms(lambda: json.loads(body))
+        if fastjson.orjson is not None:
+            orjson_ms = best_ms(lambda: fastjson.orjson.loads(body))
+            print(f"{name:<28}{len(body):>12,}{json_ms:>10.2f}{orjson_ms:>11.2f}{json_ms - orjson_ms:>10.2f}")
+        else:
+            print(f"{name:<28}{len(body):>12,}{json_ms:>10.2f}{'n/a':>11}{'':>10}")
+
+
+def bench_callback_response():
+    import plotly.io.json
+
+    print()
+    print('by_nit figures callback response (5 figures)')
+    print(f"{'size':<8}{'engine':<8}{'ms':>8}{'bytes':>10}{'gzip':>9}{'gzip ms':>9}{'br':>9}{'br ms':>8}")
+    for size, (statuses, months, process_types, _) in synthetic.SIZES.items():
+        table = build_data_from_api(synthetic.consumption_by_nit(statuses, months, process_types))
+        figures = {metric: create_figure_from_data.__wrapped__(table, 'TODOS', metric) for metric in FIGURE_METRICS}
+        response = {'multi': True, 'response': {metric: {'figure': fig} for metric, fig in figures.items()}}
+
+        engines = ['json'] + (['orjson'] if fastjson.orjson is not None else [])
+        for engine in engines:
+            serialize = lambda: plotly.io.json.to_json_plotly(response, engine=engine)
+            body = serialize().encode()
+            line = f"{size:<8}{engine:<8}{best_ms(serialize, number=3, repeat=3):>8.2f}{len(body):>10,}"
+
+            gzipped = gzip.compress(body, compresslevel=6)
+            line += f"{len(gzipped):>9,}{best_ms(lambda: gzip.compress(body, compresslevel=6)):>9.2f}"
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=4)
+                line += f"{len(compressed):>9,}{best_ms(lambda: brotli.compress(body, quality=4)):>8.2f}"
+            print(line)
+
+
+if __name__ == '__main__':
+    print(f"Fast JSON engine: {fastjson.ENGINE}")
+    bench_parsing()
+    bench_callback_response()
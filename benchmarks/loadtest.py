@@ -0,0 +1,371 @@
+"""Concurrent load test of the dashboard through its Dash HTTP endpoints.
+
+Each simulated session does what a browser does on /by-nit?nit=...&user=...: it
+loads the page, _dash-layout and _dash-dependencies, then replays the callback
+chain through _dash-update-component, mounting the returned page layout and firing
+the callbacks its inputs trigger. It then changes the status and the date range the
+way a user would. Clientside callbacks are not run.
+
+Against a running deployment (with benchmarks/fake_upstream.py as its upstream):
+
+    python -m benchmarks.loadtest --target http://127.0.0.1:8080 --upstream http://127.0.0.1:5050 --sessions 20
+
+Or start the fake upstream and gunicorn as configured in the Dockerfile:
+
+    python -m benchmarks.loadtest --spawn --workers 4 --size huge --latency 0.2 --sessions 20
+
+It reports throughput, p50/p95/p99 latency per request kind and callback, and the
+upstream calls per session (read from the fake upstream's /_fake/stats).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    index = max(int(round(pct / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+class Recorder:
+    """Thread-safe request timings per label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.timings[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+    def summary(self):
+        rows = []
+        for label, timings in sorted(self.timings.items()):
+            timings = sorted(timings)
+            rows.append({
+                'label': label,
+                'count': len(timings),
+                'errors': self.errors[label],
+                'p50_ms': percentile(timings, 50) * 1000,
+                'p95_ms': percentile(timings, 95) * 1000,
+                'p99_ms': percentile(timings, 99) * 1000,
+            })
+        return rows
+
+
+def _callback_label(output):
+    # The first output identifies the callback, as in data/metrics.py
+    return output.strip('.').split('...')[0]
+
+
+def _outputs(callback):
+    output = callback['output']
+    if output.startswith('..'):
+        return [tuple(part.rsplit('.', 1)) for part in output.strip('.').split('...')]
+    return [tuple(output.rsplit('.', 1))]
+
+
+class DashSession:
+    """One browser tab: the component props it holds and the server callbacks it fires."""
+
+    def __init__(self, base_url, recorder, parallel=6):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.http = requests.Session()
+        self.parallel = parallel
+        self.props = {}
+        self.callbacks = []
+        self.location = {}
+
+    def _timed(self, label, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=120, **kwargs)
+        except requests.exceptions.RequestException:
+            self.recorder.record(label, time.perf_counter() - started, False)
+            return None
+        self.recorder.record(label, time.perf_counter() - started, response.status_code in (200, 204))
+        return response
+
+    def open(self, path):
+        """Load the page and run the callbacks of its initial render."""
+        pathname, _, search = path.partition('?')
+        self.location = {'pathname': pathname, 'search': f'?{search}' if search else '', 'href': self.base_url + path}
+        self._timed('GET page', 'GET', path)
+        layout = self._timed('GET _dash-layout', 'GET', '/_dash-layout')
+        dependencies = self._timed('GET _dash-dependencies', 'GET', '/_dash-dependencies')
+        if layout is None or dependencies is None or layout.status_code != 200 or dependencies.status_code != 200:
+            return False
+        # Clientside callbacks run in the browser, so they are not part of the server load
+        self.callbacks = [callback for callback in dependencies.json() if not callback.get('clientside_function')]
+        self.props = {}
+        new_ids, mounted = self._mount(layout.json())
+        self._run(new_ids, mounted)
+        return True
+
+    def set_props(self, changes):
+        """Change props as user input would, e.g. {('status-dropdown', 'value'): 'Exitoso'}."""
+        self.props.update(changes)
+        self._run(set(), set(changes))
+
+    def _mount(self, tree):
+        """Collect the props of the components in tree; return (their ids, props set on mount)."""
+        new_ids, mounted = set(), set()
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict) or 'props' not in node:
+                continue
+            props = node['props']
+            component_id = props.get('id')
+            if isinstance(component_id, str):
+                new_ids.add(component_id)
+                for prop, value in props.items():
+                    self.props[(component_id, prop)] = value
+                # dcc.Location reports the browser URL once it mounts
+                if node.get('type') == 'Location':
+                    for prop, value in self.location.items():
+                        self.props[(component_id, prop)] = value
+                        mounted.add((component_id, prop))
+            for value in props.values():
+                if isinstance(value, (list, dict)):
+                    stack.append(value)
+        return new_ids, mounted
+
+    def _run(self, new_ids, changed):
+        pending = self._triggered(new_ids, changed, {})
+        while pending:
+            # Like the renderer, hold back callbacks whose inputs another pending callback is about to change
+            blocked_outputs = {output for index in pending for output in _outputs(self.callbacks[index])}
+            ready = [
+                index for index in pending
+                if not any(
+                    (item['id'], item['property']) in blocked_outputs and (item['id'], item['property']) not in _outputs(self.callbacks[index])
+                    for item in self.callbacks[index]['inputs']
+                )
+            ] or list(pending)
+            batch = {index: pending.pop(index) for index in ready}
+
+            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+                responses = list(executor.map(lambda item: self._fire(*item), batch.items()))
+
+            new_ids, changed, written_by = set(), set(), {}
+            for index, response in zip(batch, responses):
+                for component_id, props in (response or {}).items():
+                    for prop, value in props.items():
+                        self.props[(component_id, prop)] = value
+                        changed.add((component_id, prop))
+                        written_by.setdefault((component_id, prop), set()).add(index)
+                        if prop == 'children':
+                            mounted_ids, mounted = self._mount(value)
+                            new_ids |= mounted_ids
+                            changed |= mounted
+            pending = self._triggered(new_ids, changed, pending, written_by)
+
+    def _triggered(self, new_ids, changed, pending, written_by=None):
+        # Like the renderer, a callback is not fired again by the outputs it has just written itself
+        written_by = written_by or {}
+        present = {component_id for component_id, _ in self.props}
+        for index, callback in enumerate(self.callbacks):
+            inputs = [(item['id'], item['property']) for item in callback['inputs']]
+            if any(not isinstance(component_id, str) or component_id not in present for component_id, _ in inputs):
+                continue
+            if any(component_id not in present for component_id, _ in _outputs(callback)):
+                continue
+            fired_by = {item for item in inputs if item in changed and written_by.get(item, set()) != {index}}
+            initial = not callback.get('prevent_initial_call') and any(component_id in new_ids for component_id, _ in inputs)
+            if fired_by or initial:
+                pending.setdefault(index, set()).update(fired_by)
+        return pending
+
+    def _fire(self, index, changed):
+        callback = self.callbacks[index]
+        outputs = [{'id': component_id, 'property': prop} for component_id, prop in _outputs(callback)]
+
+        def values(items):
+            result = []
+            for item in items:
+                entry = {'id': item['id'], 'property': item['property']}
+                if (item['id'], item['property']) in self.props:
+                    entry['value'] = self.props[(item['id'], item['property'])]
+                result.append(entry)
+            return result
+
+        body = {
+            'output': callback['output'],
+            'outputs': outputs if callback['output'].startswith('..') else outputs[0],
+            'inputs': values(callback['inputs']),
+            'state': values(callback['state']),
+            'changedPropIds': [f'{component_id}.{prop}' for component_id, prop in sorted(changed)],
+        }
+        response = self._timed(_callback_label(callback['output']), 'POST', '/_dash-update-component', json=body)
+        if response is None or response.status_code != 200:
+            return None
+        return response.json().get('response', {})
+
+
+def run_session(base_url, recorder, nits, iterations, think, seed):
+    """Open by_nit for random NITs, then change the status and the date range."""
+    rng = random.Random(seed)
+    session = DashSession(base_url, recorder)
+    for _ in range(iterations):
+        nit = rng.choice(nits)
+        if not session.open(f'/by-nit?nit={nit}&user=0'):
+            continue
+        time.sleep(think)
+
+        options = session.props.get(('status-dropdown', 'options')) or []
+        current = session.props.get(('status-dropdown', 'value'))
+        others = [option['value'] for option in options if option['value'] != current]
+        if others:
+            session.set_props({('status-dropdown', 'value'): rng.choice(others)})
+            time.sleep(think)
+
+        end = date.today() - timedelta(days=rng.randint(0, 60))
+        start = end - timedelta(days=rng.choice([30, 90, 180]))
+        session.set_props({
+            ('date-picker-range', 'start_date'): start.isoformat(),
+            ('date-picker-range', 'end_date'): end.isoformat(),
+        })
+        time.sleep(think)
+
+
+def upstream_stats(upstream):
+    if not upstream:
+        return None
+    try:
+        return requests.get(f'{upstream.rstrip("/")}/_fake/stats', timeout=5).json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+def wait_until_up(url, timeout=90):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def spawn_stack(args):
+    """Start the fake upstream and gunicorn with the Dockerfile's command line; return (processes, target, upstream)."""
+    upstream = f'http://127.0.0.1:{args.upstream_port}'
+    target = f'http://127.0.0.1:{args.port}'
+    fake = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.fake_upstream', '--size', args.size, '--latency', str(args.latency), '--port', str(args.upstream_port)],
+        cwd=REPO_ROOT,
+    )
+    # Fresh cache and history store, so earlier runs do not answer for the upstream
+    state_dir = tempfile.mkdtemp()
+    env = dict(os.environ, DEVURL=upstream, CACHE_PATH=os.path.join(state_dir, 'cache.sqlite3'), HISTORY_PATH=os.path.join(state_dir, 'history.sqlite3'))
+    app = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{args.port}', 'app:server', '-w', str(args.workers), '--timeout', '120'],
+        cwd=REPO_ROOT, env=env,
+    )
+    processes = [app, fake]
+    if not wait_until_up(f'{upstream}/_fake/stats') or not wait_until_up(f'{target}/_startup'):
+        for process in processes:
+            process.terminate()
+        raise SystemExit('The fake upstream or gunicorn did not come up')
+    return processes, target, upstream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', default='http://127.0.0.1:8080', help='dashboard base URL')
+    parser.add_argument('--upstream', help='fake upstream base URL, for upstream calls per session')
+    parser.add_argument('--sessions', type=int, default=10, help='concurrent sessions')
+    parser.add_argument('--iterations', type=int, default=3, help='page views per session')
+    parser.add_argument('--nits', default='900000001,900000002,900000003,900000004,900000005', help='comma separated NITs to open')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds a session waits between actions')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--spawn', action='store_true', help='start the fake upstream and gunicorn locally')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers with --spawn')
+    parser.add_argument('--port', type=int, default=8081, help='gunicorn port with --spawn')
+    parser.add_argument('--upstream-port', type=int, default=5051, help='fake upstream port with --spawn')
+    parser.add_argument('--size', default='medium', help='fake upstream tenant size with --spawn')
+    parser.add_argument('--latency', type=float, default=0.1, help='fake upstream latency with --spawn')
+    args = parser.parse_args()
+
+    processes = []
+    if args.spawn:
+        processes, args.target, args.upstream = spawn_stack(args)
+
+    try:
+        recorder = Recorder()
+        nits = [nit.strip() for nit in args.nits.split(',') if nit.strip()]
+        before = upstream_stats(args.upstream)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+            futures = [
+                executor.submit(run_session, args.target, recorder, nits, args.iterations, args.think, args.seed + i)
+                for i in range(args.sessions)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+        after = upstream_stats(args.upstream)
+    finally:
+        for process in processes:
+            process.terminate()
+
+    rows = recorder.summary()
+    total = sum(row['count'] for row in rows)
+    results = {
+        'sessions': args.sessions,
+        'iterations': args.iterations,
+        'seconds': elapsed,
+        'request_count': total,
+        'requests_per_second': total / elapsed,
+        'page_views_per_second': args.sessions * args.iterations / elapsed,
+        'requests': rows,
+    }
+    if before is not None and after is not None:
+        calls = {endpoint: after.get(endpoint, 0) - before.get(endpoint, 0) for endpoint in after}
+        results['upstream_calls'] = calls
+        results['upstream_calls_per_session'] = sum(calls.values()) / args.sessions
+        results['upstream_calls_per_page_view'] = sum(calls.values()) / (args.sessions * args.iterations)
+
+    print(f"{args.sessions} sessions x {args.iterations} page views in {elapsed:.1f}s: "
+          f"{results['requests_per_second']:.1f} req/s, {results['page_views_per_second']:.2f} page views/s")
+    print(f"{'request':<48}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for row in rows:
+        print(f"{row['label']:<48}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    if 'upstream_calls' in results:
+        print(f"Upstream calls per session: {results['upstream_calls_per_session']:.1f}, "
+              f"per page view: {results['upstream_calls_per_page_view']:.1f} {results['upstream_calls']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Synthetic upstream payloads shaped like the Balance and Company API responses.
+
+One generator for every tool that needs upstream-shaped data without the real API: the JSON
+micro-benchmark, the fake upstream server and the pytest-benchmark suite.
+"""
+import random
+from datetime import date
+
+STATUSES = ['Borrador', 'Pendiente', 'En proceso', 'Rechazado', 'TODOS', 'Exitoso', 'Expirado', 'Anulado']
+AUTH_METHODS = ['Llamada', 'SMS', 'Email', 'WhatsApp']
+CREATION_TYPES = ['BackOffice', 'API']
+
+# Tenant sizes used by the benchmarks: (statuses, months, process types, users)
+SIZES = {
+    'small': (5, 1, 3, 10),
+    'medium': (8, 12, 20, 500),
+    'huge': (8, 60, 200, 20000),
+}
+
+
+def month_keys(months, until=None):
+    """Return `months` consecutive 'YYYYMM' keys ending at `until` (default: this month)."""
+    until = until or date.today()
+    keys = []
+    year, month = until.year, until.month
+    for _ in range(months):
+        keys.append(f'{year}{month:02d}')
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return keys[::-1]
+
+
+def consumption_by_nit(statuses=6, months=1, process_types=3, seed=0, month_list=None):
+    """Payload of /api/v1/Balance/get-all-consumption-by-nit."""
+    rng = random.Random(seed)
+    month_list = month_list or month_keys(months)
+    payload = []
+    for status in (STATUSES * (statuses // len(STATUSES) + 1))[:statuses]:
+        payload.append({
+            'processStatus': status,
+            'consumption': {
+                'tipoCreacion': {key: rng.randint(0, 500) for key in CREATION_TYPES},
+                'tipoProceso': {f'Proceso {i}': rng.randint(0, 200) for i in range(process_types)},
+                'tipoAutenticacion': {key: rng.randint(0, 800) for key in AUTH_METHODS},
+                'consolidados': {month: rng.randint(0, 1000) for month in month_list},
+            },
+        })
+    return payload
+
+
+def all_consumption(nits=1000, methods=6, seed=0):
+    """Payload of /api/v1/Balance/get-all-consumption."""
+    rng = random.Random(seed)
+    payload = []
+    for i in range(nits):
+        firma_seguro_method = [
+            {
+                'balanceTypeId': rng.randint(1, 3),
+                'signatureMethodId': rng.randint(1, 4),
+                'authenticationMethodId': rng.randint(1, 4),
+                'amountConsumed': rng.randint(0, 5000),
+            }
+            for _ in range(methods)
+        ]
+        payload.append({
+            'nit': str(900000000 + i),
+            'consumption': {
+                'totalAmountConsumption': sum(method['amountConsumed'] for method in firma_seguro_method),
+                'firmaSeguroMethod': firma_seguro_method,
+            },
+        })
+    return payload
+
+
+def users_by_nit(users=10):
+    """Payload of /api/v1/Company/GetAllUsersByNit/{nit}."""
+    return [{'id': i, 'fullName': f'Usuario {i:05d}', 'email': f'usuario{i}@example.com'} for i in range(1, users + 1)]
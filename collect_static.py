@@ -0,0 +1,85 @@
+"""Copy the Dash component bundles and assets/ to a directory nginx serves from disk.
+
+Usage: python collect_static.py [target directory, default ./static]
+
+Files keep their plain names (nginx/default.conf strips the version fingerprint Dash
+puts in bundle URLs) and get pre-compressed .gz and, with Brotli installed, .br copies.
+"""
+import gzip
+import os
+import shutil
+import sys
+
+# Only the bundles the app registers are needed; nothing may call the upstream API
+os.environ['DASH_SERVE_LOCALLY'] = 'true'
+os.environ['CACHE_WARMER'] = 'false'
+os.environ['WARMUP_ON_START'] = 'false'
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.js', '.css', '.map', '.json', '.svg', '.txt', '.html')
+
+
+def _compress(path):
+    if not path.endswith(COMPRESSIBLE):
+        return
+    with open(path, 'rb') as f:
+        content = f.read()
+    with open(f'{path}.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9))
+    if brotli is not None:
+        with open(f'{path}.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+    # Same mtime as the original so nginx sends matching Last-Modified headers for every variant
+    stat = os.stat(path)
+    for variant in (f'{path}.gz', f'{path}.br'):
+        if os.path.exists(variant):
+            os.utime(variant, (stat.st_atime, stat.st_mtime))
+
+
+def _copy(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(source, target)
+    _compress(target)
+
+
+def collect(target):
+    from app import app
+
+    # Rendering the index registers every bundle the layout and pages need, including async chunks
+    app.server.test_client().get(app.config.routes_pathname_prefix)
+
+    # Empty the directory rather than removing it, it may be a mounted volume
+    os.makedirs(target, exist_ok=True)
+    for entry in os.scandir(target):
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+
+    count = 0
+    for namespace, paths in app.registered_paths.items():
+        package_dir = os.path.dirname(sys.modules[namespace].__file__)
+        for relative_path in paths:
+            source = os.path.join(package_dir, relative_path)
+            # Some packages register source maps they do not ship
+            if not os.path.isfile(source):
+                continue
+            _copy(source, os.path.join(target, '_dash-component-suites', namespace, relative_path))
+            count += 1
+
+    assets_dir = app.config.assets_folder
+    for root, _, files in os.walk(assets_dir):
+        for name in files:
+            source = os.path.join(root, name)
+            _copy(source, os.path.join(target, 'assets', os.path.relpath(source, assets_dir)))
+            count += 1
+
+    print(f"Collected {count} files into {target}" + ('' if brotli else ' (no .br variants, Brotli is not installed)'))
+
+
+if __name__ == '__main__':
+    collect(os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else 'static'))
@@ -0,0 +1,126 @@
+import base64
+import json
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from data import client
+
+# Load environment variables from .env file
+load_dotenv()
+
+url = os.getenv('DEVURL')
+
+# Refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = int(os.getenv('TOKEN_REFRESH_MARGIN', '60'))
+# Lifetime assumed when the sign-in response carries no expiry information
+TOKEN_DEFAULT_TTL = int(os.getenv('TOKEN_DEFAULT_TTL', '900'))
+
+
+def _jwt_expiry(token):
+    """Return the 'exp' claim of a JWT as a unix timestamp, or None."""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """Cache the upstream bearer token for this worker and refresh it before it expires."""
+
+    def __init__(self, auth_url, email, password):
+        self.auth_url = auth_url
+        self.email = email
+        self.password = password
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self):
+        return self._token is not None and time.time() < self._expires_at - TOKEN_REFRESH_MARGIN
+
+    def get_token(self, force_refresh=False):
+        """Return a valid token, signing in only when the cached one is missing or about to lapse."""
+        if not force_refresh and self._is_fresh():
+            return self._token
+
+        # Only one sign-in in flight at a time; late arrivals reuse its result, waiting at most for their upstream budget
+        remaining = client.remaining_budget()
+        if not self._lock.acquire(timeout=-1 if remaining is None else remaining):
+            print("Gave up waiting for the sign-in in flight: upstream budget spent")
+            return None
+        try:
+            if not force_refresh and self._is_fresh():
+                return self._token
+            self._sign_in()
+            return self._token
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Drop the cached token, e.g. after the upstream answered 401."""
+        # A sign-in in flight replaces the token anyway, so do not wait past the budget for it
+        remaining = client.remaining_budget()
+        if not self._lock.acquire(timeout=-1 if remaining is None else remaining):
+            return
+        try:
+            self._token = None
+            self._expires_at = 0.0
+        finally:
+            self._lock.release()
+
+    def _sign_in(self):
+        try:
+            response = client.post(self.auth_url, json={"email": self.email, "password": self.password})
+        except requests.exceptions.RequestException as e:
+            print(f"Authentication request failed: {e}")
+            self._token = None
+            self._expires_at = 0.0
+            return
+
+        if response.status_code != 200:
+            print(f"Authentication failed with status code {response.status_code}")
+            self._token = None
+            self._expires_at = 0.0
+            return
+
+        try:
+            res_json = response.json()
+        except requests.exceptions.JSONDecodeError:
+            print("Failed to decode authentication response")
+            self._token = None
+            self._expires_at = 0.0
+            return
+
+        token = res_json.get('access_token')
+        expires_at = None
+        if res_json.get('expires_in'):
+            expires_at = time.time() + float(res_json['expires_in'])
+        elif token:
+            expires_at = _jwt_expiry(token)
+
+        self._token = token
+        self._expires_at = expires_at if expires_at else time.time() + TOKEN_DEFAULT_TTL
+
+
+# One token manager per worker process
+token_manager = TokenManager(f"{url}/api/v1/Auth/SignIn", os.getenv('EMAIL'), os.getenv('PASSWORD'))
+
+
+def get_token(force_refresh=False):
+    """Return the cached bearer token for the upstream API."""
+    return token_manager.get_token(force_refresh=force_refresh)
+
+
+def auth_headers():
+    """Return the Authorization header for the upstream API, or None if sign-in failed."""
+    token = get_token()
+    if not token:
+        return None
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from data import fastjson, metrics
+
+# Load environment variables from .env file
+load_dotenv()
+
+# SQLite file shared by every gunicorn worker on the host
+CACHE_PATH = os.getenv('CACHE_PATH', os.path.join(tempfile.gettempdir(), 'fs_dashboard_cache.sqlite3'))
+# Upper bounds before the oldest entries are evicted
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '2000'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+
+class SharedCache:
+    """JSON value cache with per-entry TTLs stored in SQLite, safe to use from several processes."""
+
+    def __init__(self, path, max_entries, max_bytes):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connect(self):
+        # sqlite connections must not cross threads or a fork, so keep one per thread and process
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return the cached value for key, or None when it is missing or expired."""
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read failed: {e}")
+            return None
+        metrics.observe_cache(key.split(':', 1)[0], row is not None)
+        return fastjson.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        """Store a JSON-serializable value for ttl seconds and evict entries beyond the size bounds."""
+        payload = fastjson.dumps(value)
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, size, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (key, payload, len(payload), now, now + ttl),
+            )
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"Cache write failed: {e}")
+
+    def add(self, key, value, ttl):
+        """Store value only if key is missing or expired; return True when it was stored."""
+        payload = fastjson.dumps(value)
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, size, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (key, payload, len(payload), now, now + ttl),
+            )
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            print(f"Cache write failed: {e}")
+            return False
+
+    def keys(self, prefix):
+        """Return the keys of the live entries that start with prefix."""
+        try:
+            rows = self._connect().execute(
+                'SELECT key FROM cache WHERE key >= ? AND key < ? AND expires_at > ?',
+                (prefix, prefix + '\uffff', time.time()),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Cache read failed: {e}")
+            return []
+        return [row[0] for row in rows]
+
+    def delete(self, key):
+        try:
+            self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            print(f"Cache delete failed: {e}")
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+        count, total_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        # Drop the oldest entries until both bounds hold again
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('SELECT key, size FROM cache ORDER BY created_at').fetchall()
+            for key, size in rows:
+                if count <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                count -= 1
+                total_bytes -= size
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+
+
+shared_cache = SharedCache(CACHE_PATH, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+
+
+def cached(key, ttl, fetch):
+    """Return the shared cache entry for key, calling fetch() and storing its result on a miss."""
+    value = shared_cache.get(key)
+    if value is not None:
+        return value
+
+    value = fetch()
+    # Failed fetches (None) are not stored so the next caller retries
+    if value is not None:
+        shared_cache.set(key, value, ttl)
+    return value
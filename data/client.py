@@ -0,0 +1,267 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.timeout import Timeout
+
+from data import fastjson, metrics
+from data.breaker import CircuitBreaker
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Timeouts in seconds for every upstream request
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3.05'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', '30'))
+# Kept-alive connections per upstream host
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '10'))
+# Retries with exponential backoff for idempotent requests; retries never run past the caller's deadline
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
+UPSTREAM_BACKOFF = float(os.getenv('UPSTREAM_BACKOFF', '0.3'))
+# Consecutive failures (errors, timeouts, 5xx) of an endpoint before its requests are refused
+UPSTREAM_BREAKER_FAILURES = int(os.getenv('UPSTREAM_BREAKER_FAILURES', '5'))
+# Seconds an endpoint's requests are refused before one trial request is let through
+UPSTREAM_BREAKER_RESET = float(os.getenv('UPSTREAM_BREAKER_RESET', '30'))
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# Monotonic time by which the current callback must be done with the upstream, if any
+_deadline = contextvars.ContextVar('upstream_deadline', default=None)
+
+# Responses of idempotent requests that are retried
+RETRY_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """The endpoint's circuit breaker is open; the request was not sent."""
+
+
+class DeadlineExceeded(requests.exceptions.RequestException):
+    """The caller's upstream time budget is spent; the request was not sent."""
+
+
+def _build_session():
+    # Retries are made by request(), which knows the caller's deadline; urllib3's Retry would
+    # reuse the first attempt's timeouts for every retry and sleep past the deadline
+    adapter = HTTPAdapter(pool_connections=UPSTREAM_POOL_SIZE, pool_maxsize=UPSTREAM_POOL_SIZE)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """Return the pooled session of this worker process."""
+    global _session, _session_pid
+    # Sockets must not be shared with a forked parent, so build one session per process
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+def get_breaker(endpoint):
+    """Return this worker's circuit breaker for an endpoint label (see metrics.endpoint_name)."""
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(endpoint, CircuitBreaker(UPSTREAM_BREAKER_FAILURES, UPSTREAM_BREAKER_RESET))
+    return breaker
+
+
+def breaker_states():
+    """Return the state of every endpoint breaker of this worker."""
+    return {endpoint: breaker.state for endpoint, breaker in sorted(_breakers.items())}
+
+
+def set_deadline(seconds):
+    """Give the current context (and the tasks it starts) an upstream budget of seconds; return a reset token.
+
+    A budget already set is only ever shortened.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    return _deadline.set(deadline if current is None else min(current, deadline))
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining_budget():
+    """Return the seconds left of the current context's upstream budget, or None when it has none."""
+    deadline_at = _deadline.get()
+    return None if deadline_at is None else max(deadline_at - time.monotonic(), 0)
+
+
+@contextmanager
+def deadline(seconds):
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def _timeout(deadline_at):
+    # Return the timeout of the next attempt and whether the deadline made it shorter than configured
+    if deadline_at is None:
+        return Timeout(connect=UPSTREAM_CONNECT_TIMEOUT, read=UPSTREAM_READ_TIMEOUT), False
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        return None, True
+    timeout = Timeout(connect=min(UPSTREAM_CONNECT_TIMEOUT, remaining), read=min(UPSTREAM_READ_TIMEOUT, remaining), total=remaining)
+    return timeout, remaining < UPSTREAM_CONNECT_TIMEOUT + UPSTREAM_READ_TIMEOUT
+
+
+def _backoff(failures):
+    # Same schedule as urllib3's Retry: no wait before the first retry, then doubling
+    return UPSTREAM_BACKOFF * (2 ** (failures - 1)) if failures > 1 else 0
+
+
+def request(method, url, **kwargs):
+    """Send a request through the pooled session with the configured timeouts and retries.
+
+    Requests to an endpoint whose breaker is open, or past the caller's deadline, fail at
+    once with CircuitOpenError or DeadlineExceeded. Within a deadline every attempt's
+    timeouts are capped by the remaining budget, and a retry that would not fit is not made.
+    A timeout cut short by the deadline is not counted against the endpoint's breaker.
+    """
+    endpoint = metrics.endpoint_name(url)
+    deadline_at = _deadline.get()
+    timeout, capped = _timeout(deadline_at)
+    if timeout is None:
+        metrics.observe_rejected(endpoint, 'deadline')
+        raise DeadlineExceeded(f"Upstream budget spent before calling {endpoint}")
+
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        metrics.observe_rejected(endpoint, 'breaker')
+        raise CircuitOpenError(f"Circuit breaker open for {endpoint}")
+
+    attempts = 1 + (UPSTREAM_RETRIES if method.upper() == 'GET' else 0)
+    started = time.perf_counter()
+    for attempt in range(1, attempts + 1):
+        try:
+            response = get_session().request(method, url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error, response = e, None
+        except Exception as e:
+            breaker.record(False)
+            if isinstance(e, requests.exceptions.RequestException):
+                metrics.observe_upstream(url, None, time.perf_counter() - started, None)
+            raise
+        else:
+            error = None
+            if response.status_code not in RETRY_STATUSES:
+                break
+        if attempt == attempts:
+            break
+
+        # Wait and retry only when the next attempt still fits in the deadline
+        backoff = _backoff(attempt)
+        if deadline_at is not None and time.monotonic() + backoff >= deadline_at:
+            break
+        if response is not None:
+            response.close()
+        time.sleep(backoff)
+        timeout, capped = _timeout(deadline_at)
+
+    if error is not None:
+        if isinstance(error, requests.exceptions.Timeout) and capped:
+            # The caller's budget ran out, which says nothing about the upstream's health
+            breaker.cancel()
+        else:
+            breaker.record(False)
+        metrics.observe_upstream(url, None, time.perf_counter() - started, None)
+        raise error
+
+    # Client errors such as 401 or 404 say nothing about the upstream's health
+    breaker.record(response.status_code < 500)
+    # Streamed bodies are not read here; their size is only known from the headers
+    size = response.headers.get('Content-Length') if kwargs.get('stream') else len(response.content)
+    metrics.observe_upstream(url, response.status_code, time.perf_counter() - started, int(size) if size else None)
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def get_json(url, headers, description):
+    """GET url and return (parsed body or None, status code or None)."""
+    try:
+        response = get(url, headers=headers)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to fetch {description}: {e}")
+        return None, None
+
+    if response.status_code == 200:
+        try:
+            return fastjson.loads(response.content), response.status_code
+        except ValueError:
+            print(f"Failed to decode {description} response")
+    else:
+        print(f"Failed to fetch {description} with status code {response.status_code}")
+    return None, response.status_code
+
+
+def get_json_items(url, headers, description):
+    """GET url and return (iterator over the items of its top-level JSON array or None, status code or None).
+
+    The body is streamed and parsed while it downloads (see fastjson.iter_items), so the
+    caller must exhaust the iterator; read or decode errors surface while iterating.
+    """
+    try:
+        response = get(url, headers=headers, stream=True)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to fetch {description}: {e}")
+        return None, None
+
+    if response.status_code != 200:
+        print(f"Failed to fetch {description} with status code {response.status_code}")
+        response.close()
+        return None, response.status_code
+
+    def items():
+        with response:
+            # Let urllib3 undo gzip/deflate transfer encodings
+            response.raw.decode_content = True
+            yield from fastjson.iter_items(response.raw)
+
+    return items(), response.status_code
+
+
+def pool_stats():
+    """Return request and connection counters of this worker's pools."""
+    stats = {'pools': 0, 'requests': 0, 'connections_opened': 0, 'connections_reused': 0}
+    if _session is None or _session_pid != os.getpid():
+        return stats
+
+    adapters = {id(adapter): adapter for adapter in _session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats['pools'] += 1
+            stats['requests'] += pool.num_requests
+            stats['connections_opened'] += pool.num_connections
+
+    stats['connections_reused'] = max(stats['requests'] - stats['connections_opened'], 0)
+    return stats
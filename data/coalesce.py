@@ -0,0 +1,55 @@
+import threading
+import time
+
+from data.client import remaining_budget
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution and keep its result for a short TTL."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._results = {}
+
+    def do(self, key, fn):
+        """Return fn() for key, sharing the in-flight call or a result younger than the TTL.
+
+        A caller that joins an in-flight call waits at most for its upstream budget
+        (see client.set_deadline) and gets None when the budget runs out first.
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None}
+                self._in_flight[key] = call
+
+        if not leader:
+            if not call['done'].wait(timeout=remaining_budget()):
+                print(f"Gave up waiting for the in-flight call for {key}: upstream budget spent")
+                return None
+            return call['result']
+
+        try:
+            call['result'] = fn()
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                # Failed fetches (None) are not kept so the next caller retries
+                if call['result'] is not None:
+                    self._results[key] = (time.monotonic(), call['result'])
+                self._evict_expired()
+            call['done'].set()
+
+        return call['result']
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (stored_at, _) in self._results.items() if now - stored_at >= self.ttl]:
+            del self._results[key]
@@ -0,0 +1,68 @@
+import os
+import re
+
+from dotenv import load_dotenv
+
+from data.client import UPSTREAM_POOL_SIZE
+from data.consumption import get_consumption_by_nit
+from data.parallel import fetch_concurrently
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Most NITs compared at once
+COMPARE_MAX_NITS = int(os.getenv('COMPARE_MAX_NITS', '20'))
+# Month slices a comparison fetches at once; capped by the kept-alive connections so none is opened and discarded
+COMPARE_MAX_PARALLEL = min(int(os.getenv('COMPARE_MAX_PARALLEL', str(UPSTREAM_POOL_SIZE))), UPSTREAM_POOL_SIZE)
+
+# Status that the upstream reports as the sum of the others
+ALL_STATUSES = 'TODOS'
+
+
+def parse_nits(text):
+    """Return the distinct NITs of a comma, space or newline separated list, in order and capped at COMPARE_MAX_NITS."""
+    nits = []
+    for nit in re.split(r'[\s,;]+', text or ''):
+        if nit and nit not in nits:
+            nits.append(nit)
+    return nits[:COMPARE_MAX_NITS]
+
+
+def summarize(nit, json_data):
+    """Reduce a get-all-consumption-by-nit payload to the totals compared between NITs."""
+    by_status, monthly, all_monthly = {}, {}, None
+    for entry in json_data:
+        consolidados = entry["consumption"].get('consolidados')
+        if not isinstance(consolidados, dict):
+            continue
+        status = entry["processStatus"]
+        if status == ALL_STATUSES:
+            all_monthly = consolidados
+            continue
+        by_status[status] = by_status.get(status, 0) + sum(consolidados.values())
+        for month, count in consolidados.items():
+            monthly[month] = monthly.get(month, 0) + count
+
+    # The upstream total wins when it is reported; otherwise the statuses are added up
+    monthly = dict(sorted((all_monthly if all_monthly is not None else monthly).items()))
+    return {'nit': nit, 'total': sum(monthly.values()), 'by_status': by_status, 'monthly': monthly}
+
+
+def get_comparison(nits, initial_date, final_date):
+    """Fetch the consumption of every NIT concurrently; return (summaries in the given order, NITs that failed).
+
+    The NITs share the worker's token and connection pool. Their month slices go through
+    a pool of their own, COMPARE_MAX_PARALLEL threads, which never exceeds the connections
+    the session keeps alive (UPSTREAM_POOL_SIZE).
+    """
+    results = fetch_concurrently(
+        {
+            nit: (lambda nit=nit: get_consumption_by_nit(nit, 0, initial_date, final_date, pool='compare-slices', max_workers=COMPARE_MAX_PARALLEL))
+            for nit in nits
+        },
+        pool='compare',
+        max_workers=COMPARE_MAX_NITS,
+    )
+    summaries = [summarize(nit, results[nit]) for nit in nits if results[nit] is not None]
+    failed = [nit for nit in nits if results[nit] is None]
+    return summaries, failed
@@ -0,0 +1,303 @@
+import calendar
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import pytz
+from dotenv import load_dotenv
+
+from data import auth, client
+from data.cache import shared_cache
+from data.coalesce import SingleFlight
+from data.history import HISTORY_STORE, history_store, month_key
+from data.model import DIMENSIONS
+from data.parallel import UPSTREAM_FETCH_DEADLINE, fetch_concurrently, get_executor
+
+# Load environment variables from .env file
+load_dotenv()
+
+url = os.getenv('DEVURL')
+
+# Seconds a parsed response is shared between callbacks of the same interaction
+CONSUMPTION_TTL = float(os.getenv('CONSUMPTION_TTL', '5'))
+# Seconds a parsed response is kept in the cache shared by all workers
+CONSUMPTION_CACHE_TTL = float(os.getenv('CONSUMPTION_CACHE_TTL', '300'))
+# Seconds a slice that ended before today is kept; past periods no longer change
+CONSUMPTION_CLOSED_TTL = float(os.getenv('CONSUMPTION_CLOSED_TTL', str(30 * 24 * 3600)))
+# Serve the last known data of a query at once and refresh it in the background
+STALE_WHILE_REVALIDATE = os.getenv('STALE_WHILE_REVALIDATE', 'false').lower() in ('1', 'true', 'yes')
+# Oldest data, in seconds, that may be served while it is being refreshed
+MAX_STALENESS = float(os.getenv('MAX_STALENESS', '3600'))
+
+# Dates are closed or open relative to the Bogotá calendar, as on the dashboard
+bogota_tz = pytz.timezone('America/Bogota')
+
+_consumption_flight = SingleFlight(ttl=CONSUMPTION_TTL)
+
+
+def normalize_query(nit, user_id, initial_date, final_date):
+    """Return the canonical (nit, userAppId, initial_date, final_date) key for a consumption query."""
+    try:
+        user_id = int(user_id) if user_id else 0
+    except (TypeError, ValueError):
+        user_id = 0
+    return (
+        str(nit).strip() if nit else '',
+        max(user_id, 0),
+        str(initial_date)[:10] if initial_date else '',
+        str(final_date)[:10] if final_date else '',
+    )
+
+
+def _fetch_consumption_by_nit(nit, user_id, initial_date, final_date):
+    headers = auth.auth_headers()
+    if not headers:
+        return None
+
+    api_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&userAppId={user_id}&initial_date={initial_date}&final_date={final_date}'
+    json_data, status_code = client.get_json(api_url, headers, 'consumption data')
+    if status_code == 401:
+        # The token was revoked or expired early; the next call signs in again
+        auth.token_manager.invalidate()
+    return json_data
+
+
+def month_slices(initial_date, final_date):
+    """Split the inclusive range [initial_date, final_date] into one (start, end) pair per calendar month."""
+    slices = []
+    start = initial_date
+    while start <= final_date:
+        month_end = date(start.year, start.month, calendar.monthrange(start.year, start.month)[1])
+        end = min(month_end, final_date)
+        slices.append((start, end))
+        start = end + timedelta(days=1)
+    return slices
+
+
+def _is_whole_month(start, end):
+    return start.day == 1 and end.day == calendar.monthrange(end.year, end.month)[1]
+
+
+def _slice_cache_key(nit, user_id, start, end):
+    # Whole months are stored per (nit, user, month) so any range covering them can reuse them
+    if _is_whole_month(start, end):
+        return f'consumption-month:{nit}:{user_id}:{start.strftime("%Y%m")}'
+    return f'consumption:{nit}:{user_id}:{start.isoformat()}:{end.isoformat()}'
+
+
+def merge_payloads(payloads):
+    """Add up get-all-consumption-by-nit payloads of disjoint date ranges, keeping the status order."""
+    merged = {}
+    for payload in payloads:
+        for entry in payload:
+            consumption = entry["consumption"]
+            target = merged.setdefault(entry["processStatus"], {dimension: {} for dimension in DIMENSIONS})
+            for dimension in DIMENSIONS:
+                breakdown = consumption.get(dimension)
+                if not isinstance(breakdown, dict):
+                    continue
+                for key, count in breakdown.items():
+                    target[dimension][key] = target[dimension].get(key, 0) + count
+    return [{"processStatus": status, "consumption": consumption} for status, consumption in merged.items()]
+
+
+def _store_slice(cache_key, payload, slice_end, today):
+    shared_cache.set(cache_key, payload, CONSUMPTION_CLOSED_TTL if slice_end < today else CONSUMPTION_CACHE_TTL)
+
+
+def _fetch_sliced(nit, user_id, initial_date, final_date, refresh=False, pool='slices', max_workers=None):
+    """Serve the range from stored and cached month slices, fetching only the slices that are missing.
+
+    Closed months found in the history store are added up there in one query; the other
+    slices come from the shared cache or the upstream, fetched on the given thread pool.
+    With refresh=True the slices that are still open are fetched again even when cached.
+    """
+    try:
+        start = datetime.strptime(initial_date, '%Y-%m-%d').date()
+        end = datetime.strptime(final_date, '%Y-%m-%d').date()
+    except ValueError:
+        return _fetch_consumption_by_nit(nit, user_id, initial_date, final_date)
+
+    today = datetime.now(bogota_tz).date()
+    slices = month_slices(start, end)
+    closed_months = [month_key(s) for s, e in slices if HISTORY_STORE and _is_whole_month(s, e) and e < today]
+    stored = history_store.stored_months(nit, user_id, closed_months)
+    history = history_store.load(nit, user_id, stored) if stored else None
+    if history is None:
+        stored = set()
+
+    slice_keys = []
+    parts = {}
+    missing = {}
+    # Closed months not stored yet; they are stored once loaded, from the cache or the upstream
+    unstored = {}
+    for slice_start, slice_end in slices:
+        month = month_key(slice_start)
+        if month in stored:
+            # The stored months count as one slice, in the place of the first of them
+            if 'history' not in parts:
+                slice_keys.append('history')
+                parts['history'] = history
+            continue
+        cache_key = _slice_cache_key(nit, user_id, slice_start, slice_end)
+        slice_keys.append(cache_key)
+        if month in closed_months:
+            unstored[cache_key] = month
+        payload = None if refresh and slice_end >= today else shared_cache.get(cache_key)
+        if payload is not None:
+            parts[cache_key] = payload
+        else:
+            missing[cache_key] = (slice_start, slice_end)
+
+    fetched = fetch_concurrently(
+        {
+            cache_key: (lambda s=slice_start, e=slice_end: _fetch_consumption_by_nit(nit, user_id, s.isoformat(), e.isoformat()))
+            for cache_key, (slice_start, slice_end) in missing.items()
+        },
+        pool=pool,
+        max_workers=max_workers,
+    )
+    for cache_key, payload in fetched.items():
+        # Never serve a partial range
+        if payload is None:
+            return None
+        _store_slice(cache_key, payload, missing[cache_key][1], today)
+        parts[cache_key] = payload
+
+    for cache_key, month in unstored.items():
+        history_store.save_month(nit, user_id, month, parts[cache_key])
+
+    if len(slice_keys) == 1:
+        return parts[slice_keys[0]]
+    return merge_payloads(parts[cache_key] for cache_key in slice_keys)
+
+
+def _load_slice(nit, user_id, slice_start, slice_end, today):
+    month = month_key(slice_start)
+    closed = HISTORY_STORE and _is_whole_month(slice_start, slice_end) and slice_end < today
+    if closed and history_store.stored_months(nit, user_id, [month]):
+        payload = history_store.load(nit, user_id, [month])
+        if payload is not None:
+            return payload
+
+    cache_key = _slice_cache_key(nit, user_id, slice_start, slice_end)
+    payload = shared_cache.get(cache_key)
+    if payload is None:
+        payload = _fetch_consumption_by_nit(nit, user_id, slice_start.isoformat(), slice_end.isoformat())
+        if payload is not None:
+            _store_slice(cache_key, payload, slice_end, today)
+    if payload is not None and closed:
+        history_store.save_month(nit, user_id, month, payload)
+    return payload
+
+
+def iter_consumption_slices(nit, user_id, initial_date, final_date):
+    """Yield (start, end, payload) for each calendar month of the range, holding one month at a time.
+
+    Slices come from the shared cache when present; the next missing one is fetched while
+    the current one is consumed. A slice that cannot be loaded yields a None payload.
+    """
+    nit, user_id, initial_date, final_date = normalize_query(nit, user_id, initial_date, final_date)
+    start = datetime.strptime(initial_date, '%Y-%m-%d').date()
+    end = datetime.strptime(final_date, '%Y-%m-%d').date()
+    today = datetime.now(bogota_tz).date()
+
+    executor = get_executor('slices')
+    pending = None
+    for slice_start, slice_end in month_slices(start, end):
+        future = executor.submit(_load_slice, nit, user_id, slice_start, slice_end, today)
+        if pending is not None:
+            yield pending[0], pending[1], pending[2].result()
+        pending = (slice_start, slice_end, future)
+    if pending is not None:
+        yield pending[0], pending[1], pending[2].result()
+
+
+def get_consumption_by_nit(nit, user_id, initial_date, final_date, refresh=False, pool='slices', max_workers=None):
+    """Return the parsed get-all-consumption-by-nit payload for a date range.
+
+    The range is served from per-month slices in the cache shared by all workers, so
+    only uncovered or still-open slices reach the upstream, and concurrent callers for
+    the same query share one computation. refresh=True refetches the open slices.
+    pool and max_workers select the thread pool the missing slices are fetched on.
+    """
+    key = normalize_query(nit, user_id, initial_date, final_date)
+    if not key[0]:
+        return None
+    if refresh:
+        return _fetch_sliced(*key, refresh=True, pool=pool, max_workers=max_workers)
+    return _consumption_flight.do(key, lambda: _fetch_sliced(*key, pool=pool, max_workers=max_workers))
+
+
+def _last_known_key(key):
+    return 'last-known:' + ':'.join(str(part) for part in key)
+
+
+def _remember(key, payload):
+    fetched_at = time.time()
+    shared_cache.set(_last_known_key(key), {'data': payload, 'fetched_at': fetched_at}, MAX_STALENESS)
+    return fetched_at
+
+
+def revalidate_consumption(nit, user_id, initial_date, final_date, pool='slices', max_workers=None):
+    """Refetch the open slices of a query, on the given thread pool, and record the result as its last known data."""
+    key = normalize_query(nit, user_id, initial_date, final_date)
+    if not key[0]:
+        return None
+    payload = _fetch_sliced(*key, refresh=True, pool=pool, max_workers=max_workers)
+    if payload is not None:
+        _remember(key, payload)
+    return payload
+
+
+def get_last_known_consumption(nit, user_id, initial_date, final_date):
+    """Return (payload, fetched_at) of the last known data of a query, or (None, None)."""
+    key = normalize_query(nit, user_id, initial_date, final_date)
+    entry = shared_cache.get(_last_known_key(key)) if key[0] else None
+    if entry is None:
+        return None, None
+    return entry['data'], entry['fetched_at']
+
+
+def get_consumption_or_last_known(nit, user_id, initial_date, final_date):
+    """Return (payload, None) for current data, or (payload, fetched_at) of the last known data when it cannot be loaded.
+
+    Used without STALE_WHILE_REVALIDATE so an upstream incident (e.g. an open circuit
+    breaker) shows data up to MAX_STALENESS old instead of an error.
+    """
+    key = normalize_query(nit, user_id, initial_date, final_date)
+    if not key[0]:
+        return None, None
+    payload = get_consumption_by_nit(*key)
+    if payload is None:
+        return get_last_known_consumption(*key)
+    # Only written when missing or expired, so loads of the same query stay cheap
+    shared_cache.add(_last_known_key(key), {'data': payload, 'fetched_at': time.time()}, MAX_STALENESS)
+    return payload, None
+
+
+def get_consumption_swr(nit, user_id, initial_date, final_date):
+    """Return (payload, fetched_at, revalidating) for a date range without waiting on a slow upstream.
+
+    Data younger than CONSUMPTION_CACHE_TTL is returned as is. Older data, up to
+    MAX_STALENESS, is returned at once while one worker refreshes it in the background
+    (revalidating=True). Only a query that was never loaded waits for the upstream.
+    """
+    key = normalize_query(nit, user_id, initial_date, final_date)
+    if not key[0]:
+        return None, None, False
+
+    entry = shared_cache.get(_last_known_key(key))
+    if entry is None:
+        payload = get_consumption_by_nit(*key)
+        if payload is None:
+            return None, None, False
+        return payload, _remember(key, payload), False
+
+    if time.time() - entry['fetched_at'] < CONSUMPTION_CACHE_TTL:
+        return entry['data'], entry['fetched_at'], False
+
+    # One refresh per query across workers; the lease lapses if that refresh dies
+    if shared_cache.add(f'revalidate:{_last_known_key(key)}', os.getpid(), UPSTREAM_FETCH_DEADLINE):
+        get_executor('revalidate').submit(revalidate_consumption, *key)
+    return entry['data'], entry['fetched_at'], True
@@ -0,0 +1,132 @@
+import math
+import os
+
+from dotenv import load_dotenv
+
+from data.coalesce import SingleFlight
+from data.consumption import STALE_WHILE_REVALIDATE, get_consumption_or_last_known, get_consumption_swr, normalize_query
+from data.model import build_data_from_api
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Rows per page of the drill-down table
+DRILLDOWN_PAGE_SIZE = int(os.getenv('DRILLDOWN_PAGE_SIZE', '20'))
+# Seconds a worker keeps the prepared table of a query for further paging, sorting and filtering
+DRILLDOWN_TABLE_TTL = float(os.getenv('DRILLDOWN_TABLE_TTL', '60'))
+
+COLUMNS = [
+    {'name': 'Estado', 'id': 'status'},
+    {'name': 'Categoría', 'id': 'dimension'},
+    {'name': 'Clave', 'id': 'key'},
+    {'name': 'Cantidad', 'id': 'count', 'type': 'numeric'},
+]
+
+DIMENSION_LABELS = {
+    'tipoCreacion': 'Tipo de creación',
+    'tipoProceso': 'Tipo de proceso',
+    'tipoAutenticacion': 'Tipo de autenticación',
+    'consolidados': 'Mes',
+}
+
+# Operators of the DataTable filter syntax, each with its aliases
+FILTER_OPERATORS = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+]
+
+_tables_flight = SingleFlight(ttl=DRILLDOWN_TABLE_TTL)
+
+
+def _prepare_table(nit, user_id, initial_date, final_date):
+    if STALE_WHILE_REVALIDATE:
+        json_data, _, _ = get_consumption_swr(nit, user_id, initial_date, final_date)
+    else:
+        json_data, _ = get_consumption_or_last_known(nit, user_id, initial_date, final_date)
+    if json_data is None:
+        return None
+
+    table = build_data_from_api(json_data)
+    # Plain string columns so filters and sorts compare the displayed values
+    return table.assign(
+        status=table['status'].astype(str),
+        dimension=table['dimension'].cat.rename_categories(DIMENSION_LABELS).astype(str),
+        key=table['key'].astype(str),
+    )
+
+
+def get_drilldown_table(nit, user_id, initial_date, final_date, as_of=None):
+    """Return the long consumption table of a query with display labels, kept briefly per worker.
+
+    as_of tells apart versions of the same query, so refreshed data is not served from an older table.
+    """
+    key = normalize_query(nit, user_id, initial_date, final_date)
+    if not key[0]:
+        return None
+    return _tables_flight.do((*key, as_of), lambda: _prepare_table(*key))
+
+
+def split_filter_part(filter_part):
+    """Parse one '{column} operator value' part of a DataTable filter query into (column, operator, value)."""
+    for aliases in FILTER_OPERATORS:
+        for alias in aliases:
+            if alias in filter_part:
+                name_part, value_part = filter_part.split(alias, 1)
+                name = name_part[name_part.find('{') + 1:name_part.rfind('}')]
+                value_part = value_part.strip()
+                if len(value_part) > 1 and value_part[0] == value_part[-1] and value_part[0] in ('"', "'", '`'):
+                    value = value_part[1:-1].replace('\\' + value_part[0], value_part[0])
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                return name, aliases[0].strip(), value
+    return None, None, None
+
+
+def _apply_filter(table, column, operator, value):
+    if column not in table.columns:
+        return table
+    series = table[column]
+    if column != 'count':
+        # Numbers typed in a text column (e.g. a month like 202401) compare as text
+        value = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+    elif not isinstance(value, float):
+        return table.iloc[0:0]
+
+    if operator == 'contains':
+        return table[series.astype(str).str.contains(str(value), case=False, regex=False)]
+    comparisons = {
+        'eq': series.__eq__, 'ne': series.__ne__, 'lt': series.__lt__,
+        'le': series.__le__, 'gt': series.__gt__, 'ge': series.__ge__,
+    }
+    return table[comparisons[operator](value)]
+
+
+def query_rows(table, status, filter_query, sort_by, page_current, page_size):
+    """Filter, sort and page the table on the server; return (rows of one page, page count, page index)."""
+    if status:
+        table = table[table['status'] == status]
+
+    for filter_part in (filter_query or '').split(' && '):
+        column, operator, value = split_filter_part(filter_part)
+        if column is not None:
+            table = _apply_filter(table, column, operator, value)
+
+    if sort_by:
+        table = table.sort_values(
+            [sort['column_id'] for sort in sort_by],
+            ascending=[sort['direction'] == 'asc' for sort in sort_by],
+            kind='mergesort',
+        )
+
+    page_count = max(math.ceil(len(table) / page_size), 1)
+    page_current = min(max(page_current or 0, 0), page_count - 1)
+    page = table.iloc[page_current * page_size:(page_current + 1) * page_size]
+    return page.to_dict('records'), page_count, page_current
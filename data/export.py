@@ -0,0 +1,154 @@
+import csv
+import importlib.util
+import io
+import os
+import re
+from datetime import datetime
+from itertools import chain
+
+from dotenv import load_dotenv
+
+from data.consumption import iter_consumption_slices, normalize_query
+from data.model import DIMENSIONS
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Rows written per CSV chunk sent to the client
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '5000'))
+
+# pyarrow is optional: without it only CSV exports are offered. It is imported by the first
+# Parquet export rather than here, so it stays out of worker boot
+EXPORT_FORMATS = ['csv', 'parquet'] if importlib.util.find_spec('pyarrow') is not None else ['csv']
+
+FIELDS = ['nit', 'user_id', 'period_start', 'period_end', 'status', 'dimension', 'key', 'count']
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def iter_rows(nit, user_id, period_start, period_end, payload):
+    """Yield the normalized (nit, user_id, period_start, period_end, status, dimension, key, count) rows of one payload."""
+    for entry in payload:
+        consumption = entry["consumption"]
+        # Skip entries without a valid breakdown, as the API sends for some statuses
+        if not isinstance(consumption.get('tipoCreacion', {}), dict):
+            continue
+        for dimension in DIMENSIONS:
+            for key, count in (consumption.get(dimension) or {}).items():
+                yield nit, user_id, period_start, period_end, entry["processStatus"], dimension, key, count
+
+
+def _checked(nit, user_id, slices):
+    # A payload that cannot be loaded aborts the download instead of ending it early, so a
+    # client never keeps a file that silently misses months
+    for period_start, period_end, payload in slices:
+        if payload is None:
+            raise RuntimeError(f"Failed to load consumption of {nit} user {user_id} for {period_start}..{period_end}")
+        yield period_start, period_end, payload
+
+
+def stream_csv(nit, user_id, slices):
+    """Yield the CSV export in chunks of EXPORT_CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    rows = 0
+    for period_start, period_end, payload in _checked(nit, user_id, slices):
+        for row in iter_rows(nit, user_id, period_start.isoformat(), period_end.isoformat(), payload):
+            writer.writerow(row)
+            rows += 1
+            if rows % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+class _Drain:
+    """Write-only file object whose content is taken out after each Parquet row group."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_parquet(nit, user_id, slices):
+    """Yield the Parquet export, one row group per month."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('nit', pa.string()),
+        ('user_id', pa.int64()),
+        ('period_start', pa.date32()),
+        ('period_end', pa.date32()),
+        ('status', pa.string()),
+        ('dimension', pa.string()),
+        ('key', pa.string()),
+        ('count', pa.int64()),
+    ])
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for period_start, period_end, payload in _checked(nit, user_id, slices):
+            columns = list(zip(*iter_rows(nit, user_id, period_start, period_end, payload)))
+            if columns:
+                writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+                yield sink.take()
+    yield sink.take()
+
+
+def install(server, routes_pathname_prefix='/'):
+    """Serve exports at {prefix}export/consumption.<csv|parquet>?nit=&user_id=&start_date=&end_date=."""
+    from flask import Response, request
+
+    @server.route(f'{routes_pathname_prefix}export/consumption.<export_format>')
+    def export_consumption(export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response(f"Unsupported export format: {export_format}", status=404, mimetype='text/plain')
+
+        nit, user_id, start_date, end_date = normalize_query(
+            request.args.get('nit'), request.args.get('user_id'), request.args.get('start_date'), request.args.get('end_date'),
+        )
+        try:
+            if not nit or datetime.strptime(start_date, '%Y-%m-%d') > datetime.strptime(end_date, '%Y-%m-%d'):
+                raise ValueError
+        except ValueError:
+            return Response("nit, start_date and end_date (YYYY-MM-DD) are required", status=400, mimetype='text/plain')
+
+        slices = iter_consumption_slices(nit, user_id, start_date, end_date)
+        # Load the first month before answering, so an unreachable upstream is still reported with a status code
+        first = next(slices, None)
+        if first is not None and first[2] is None:
+            return Response("Failed to fetch consumption data", status=502, mimetype='text/plain')
+        slices = chain([first] if first is not None else [], slices)
+
+        stream = stream_csv if export_format == 'csv' else stream_parquet
+        filename = re.sub(r'[^\w.-]', '_', f'consumo_{nit}_{start_date}_{end_date}.{export_format}')
+        return Response(stream(nit, user_id, slices), mimetype=MIMETYPES[export_format], headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let nginx pass the chunks through as they are produced
+            'X-Accel-Buffering': 'no',
+        })
@@ -0,0 +1,47 @@
+import json
+
+# orjson is optional: it is several times faster than the standard library for large
+# payloads, and everything falls back to json when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson is optional too: it parses large arrays incrementally while they download
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+ENGINE = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """Parse JSON from bytes or str; raises ValueError on invalid input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Serialize obj to a compact JSON str."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def iter_items(file):
+    """Yield the items of the top-level JSON array read from a binary file object.
+
+    Without ijson the whole document is read and parsed first.
+    """
+    if ijson is not None:
+        return ijson.items(file, 'item', use_float=True)
+    return iter(loads(file.read()))
+
+
+def configure_plotly():
+    """Make plotly, and with it Dash's callback responses, serialize with the same engine."""
+    import plotly.io.json
+
+    plotly.io.json.config.default_engine = ENGINE
@@ -0,0 +1,104 @@
+import functools
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from data import fastjson, metrics
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Figures kept per worker before the least recently used one is dropped
+FIGURE_CACHE_SIZE = int(os.getenv('FIGURE_CACHE_SIZE', '256'))
+
+
+class FigureCache:
+    """Thread-safe LRU of serialized figures."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is None:
+                self.misses += 1
+                return None
+            self._figures.move_to_end(key)
+            self.hits += 1
+            return figure
+
+    def set(self, key, figure):
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_size:
+                self._figures.popitem(last=False)
+
+
+figure_cache = FigureCache(FIGURE_CACHE_SIZE)
+
+
+def content_hash(table):
+    """Return a digest of the table's content, independent of the object identity."""
+    import pandas as pd
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(','.join(table.columns).encode())
+    digest.update(pd.util.hash_pandas_object(table, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+# Content hashes of live tables by id(); DataFrames are unhashable, so a WeakKeyDictionary cannot hold them.
+# The hash is not kept in table.attrs because pandas copies attrs to every frame derived from the table.
+_table_hashes = {}
+_table_hashes_lock = threading.Lock()
+
+
+def _forget_table(ref, table_id):
+    with _table_hashes_lock:
+        if _table_hashes.get(table_id, (None,))[0] is ref:
+            del _table_hashes[table_id]
+
+
+def table_hash(table):
+    """Return content_hash(table), computed once per table object."""
+    with _table_hashes_lock:
+        entry = _table_hashes.get(id(table))
+    if entry is not None and entry[0]() is table:
+        return entry[1]
+
+    digest = content_hash(table)
+    ref = weakref.ref(table, functools.partial(_forget_table, table_id=id(table)))
+    with _table_hashes_lock:
+        _table_hashes[id(table)] = (ref, digest)
+    return digest
+
+
+def memoize_figure(build_figure):
+    """Cache build_figure(table, selected_status, metric) as plain figure JSON.
+
+    Cache hits skip both the plotly.express construction and the plotly JSON encoding;
+    Dash sends the stored dict as is.
+    """
+    @functools.wraps(build_figure)
+    def wrapper(table, selected_status, metric):
+        # Several figures are built from the same table, so hash it only once
+        key = (table_hash(table), metric, selected_status)
+        figure = figure_cache.get(key)
+        metrics.observe_cache('figure', figure is not None)
+        if figure is None:
+            with metrics.timed_figure(metric):
+                figure = fastjson.loads(build_figure(table, selected_status, metric).to_json(engine=fastjson.ENGINE))
+            figure_cache.set(key, figure)
+        return figure
+
+    return wrapper
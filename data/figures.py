@@ -0,0 +1,232 @@
+"""Chart builders of the NIT, all-NITs and comparison pages.
+
+They live outside pages/ so the benchmarks can build the same figures without creating the Dash app.
+"""
+from data.figure_cache import memoize_figure
+from data.model import get_breakdown, get_statuses, get_status_totals
+
+# pandas and plotly are imported inside the functions so importing this module stays light.
+# Month names follow the process locale, which pages/by_nit.py sets to Spanish.
+
+
+# Generic callback for fetching data and updating visualizations; identical inputs reuse the cached figure JSON
+@memoize_figure
+def create_figure_from_data(table, selected_status, metric):
+    """Build one chart from the long consumption table (see data.model)."""
+    import pandas as pd
+    import plotly.express as px
+
+    # Filter data and create figure based on chart type
+    if metric == 'auth_method':
+        # Breakdown of tipoAutenticacion for the selected status
+        auth_df = get_breakdown(table, selected_status, 'tipoAutenticacion')
+        auth_df.columns = ['Tipo Autenticacion', 'Count']
+
+        fig = px.bar(
+            auth_df,
+            x='Tipo Autenticacion',
+            y='Count',
+            labels={'x': 'Método', 'Count': 'Total'},
+            title=f'Firmas por tipo de Autenticación',
+            color='Tipo Autenticacion',
+            text='Count',
+        )
+
+        # Update the layout to position the text on top of each bar
+        fig.update_traces(textposition='inside')   
+
+        return fig
+    elif metric in ('creation_type', 'process_type'):
+        if metric == 'creation_type':
+            dimension, label, title = 'tipoCreacion', 'Tipo Creacion', 'Procesos por tipo de creación'
+        else:
+            dimension, label, title = 'tipoProceso', 'Tipo Proceso', 'Procesos por tipo de proceso'
+
+        # Check if there's any data available
+        if selected_status not in get_statuses(table):
+            # If no data available, return an empty figure with a message
+            fig = px.pie(
+                names=['No Data Available'],
+                values=[1],
+                title=f'Tipo Creacion for Status: {selected_status}',
+                hole=0.4
+            )
+        else:
+            donut_df = get_breakdown(table, selected_status, dimension)
+            donut_df.columns = [label, 'Count']
+            
+            # Create the donut chart
+            fig = px.pie(
+                donut_df,
+                names=label,
+                values='Count',
+                title=title,
+                hole=0.4  # Create a donut chart
+            )
+
+            if donut_df['Count'].sum() == 0:
+                fig.add_annotation(
+                    text=f"No hay resultados para {selected_status}",
+                    font=dict(
+                        family="Arial, sans-serif",
+                        size=18,
+                        color="#000"
+                    ),
+                    align="center",
+                    xref="paper", 
+                    yref="paper",
+                    x=0.1, 
+                    y=0.5, 
+                    showarrow=False
+                )
+            
+        return fig
+
+    elif metric == 'consolidated':
+        consolidados_df = get_breakdown(table, selected_status, 'consolidados')
+        consolidados_df.columns = ['Month', 'Count']
+        
+        # Convert 'Month' to datetime format including year
+        consolidados_df['Month'] = pd.to_datetime(consolidados_df['Month'] + '01', format='%Y%m%d')
+
+        # Format 'Month' to show month and year
+        consolidados_df['Month'] = consolidados_df['Month'].dt.strftime('%B %Y')
+
+        fig = px.line(
+            consolidados_df, 
+            x="Month", 
+            y="Count",
+            title='Procesos por mes',
+            labels={'Month': 'Mes', 'Count': 'Total mes'},
+            text='Count'
+        )
+
+        # Add text labels on the line chart
+        fig.update_traces(textposition="middle left")
+        
+        return fig
+
+    elif metric == 'status_totals':
+        df = get_status_totals(table)
+        df = df[df['processStatus'] != 'TODOS']
+
+        if (selected_status.lower() != 'todos'):
+            df = df[df['processStatus'] == selected_status]
+
+        fig = px.bar(
+            df,
+            y='processStatus',
+            x='totalConsolidado',
+            orientation='h',
+            title='Procesos por estado',
+            labels={'processStatus': 'Estado', 'totalConsolidado': 'Total Consolidado'},
+            color='processStatus',
+            text='totalConsolidado'  # Display the total consolidado value on top of each bar
+        )
+
+        # Update the layout to position the text on top of each bar
+        fig.update_traces(textposition='inside')
+
+        return fig
+
+    # Add more chart types as needed
+    return px.bar()
+
+
+def empty_figure(title):
+    """Return an empty plot used when there is no data to render."""
+    import plotly.express as px
+
+    return px.bar(x=[], y=[], title=title)
+
+
+# Titles of the fleet charts per firmaSeguroMethod key
+FLEET_METHOD_TITLES = {
+    'balanceTypeId': ('Consumo por tipo de saldo', 'Tipo de saldo'),
+    'signatureMethodId': ('Consumo por método de firma', 'Método de firma'),
+    'authenticationMethodId': ('Consumo por método de autenticación', 'Método de autenticación'),
+}
+
+
+def create_top_nits_figure(rollup):
+    """Bar chart of the tenants with the highest consumption (see data.fleet)."""
+    import plotly.express as px
+
+    # Largest at the top of the horizontal bars
+    top = rollup['top'][::-1]
+    fig = px.bar(
+        x=[entry['total'] for entry in top],
+        y=[entry['nit'] for entry in top],
+        orientation='h',
+        title=f"Top {len(top)} NIT por consumo",
+        labels={'x': 'Consumo total', 'y': 'NIT'},
+        text=[entry['total'] for entry in top],
+    )
+    fig.update_traces(textposition='inside')
+    fig.update_yaxes(type='category')
+    return fig
+
+
+def create_fleet_method_figure(rollup, key):
+    """Donut of the fleet consumption by one firmaSeguroMethod key."""
+    import plotly.express as px
+
+    title, label = FLEET_METHOD_TITLES[key]
+    methods = rollup['by_method'][key]
+    return px.pie(
+        names=[f"{label} {method['id']}" for method in methods],
+        values=[method['amount'] for method in methods],
+        title=title,
+        hole=0.4,
+    )
+
+
+def create_fleet_breakdown_figure(rollup):
+    """Grouped bars of the fleet consumption per signature method and authentication method."""
+    import plotly.express as px
+
+    breakdown = rollup['by_signature_and_authentication']
+    fig = px.bar(
+        x=[f"Firma {entry['signatureMethodId']}" for entry in breakdown],
+        y=[entry['amount'] for entry in breakdown],
+        color=[f"Autenticación {entry['authenticationMethodId']}" for entry in breakdown],
+        barmode='group',
+        title='Consumo por método de firma y autenticación',
+        labels={'x': 'Método de firma', 'y': 'Cantidad consumida', 'color': 'Autenticación'},
+    )
+    return fig
+
+
+def create_compare_totals_figure(summaries, normalized=False):
+    """Stacked bars of the processes per status of each compared NIT; normalized shows each NIT's status mix in %."""
+    import plotly.express as px
+
+    statuses = list(dict.fromkeys(status for summary in summaries for status in summary['by_status']))
+    fig = px.bar(
+        x=[summary['nit'] for summary in summaries for _ in statuses],
+        y=[summary['by_status'].get(status, 0) for summary in summaries for status in statuses],
+        color=[status for _ in summaries for status in statuses],
+        title='Procesos por estado (%)' if normalized else 'Procesos por estado',
+        labels={'x': 'NIT', 'y': '% de procesos' if normalized else 'Total', 'color': 'Estado'},
+    )
+    fig.update_layout(barmode='stack', barnorm='percent' if normalized else None)
+    fig.update_xaxes(type='category')
+    return fig
+
+
+def create_compare_monthly_figure(summaries, normalized=False):
+    """Stacked areas of the monthly consolidados of each compared NIT; normalized shows each NIT's share of the month in %."""
+    import pandas as pd
+    import plotly.express as px
+
+    months = sorted({month for summary in summaries for month in summary['monthly']})
+    labels = pd.to_datetime([month + '01' for month in months], format='%Y%m%d').strftime('%B %Y')
+    fig = px.area(
+        x=[label for _ in summaries for label in labels],
+        y=[summary['monthly'].get(month, 0) for summary in summaries for month in months],
+        color=[summary['nit'] for summary in summaries for _ in months],
+        groupnorm='percent' if normalized else None,
+        title='Procesos por mes (% del mes)' if normalized else 'Procesos por mes',
+        labels={'x': 'Mes', 'y': '% del mes' if normalized else 'Total mes', 'color': 'NIT'},
+    )
+    return fig
@@ -0,0 +1,109 @@
+import heapq
+import os
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from data import auth, client
+from data.cache import cached, shared_cache
+from data.coalesce import SingleFlight
+
+# Load environment variables from .env file
+load_dotenv()
+
+url = os.getenv('DEVURL')
+
+# Seconds the rollup of a date range is kept in the shared cache
+FLEET_CACHE_TTL = float(os.getenv('FLEET_CACHE_TTL', '600'))
+# Tenants listed in the top consumers ranking
+FLEET_TOP_K = int(os.getenv('FLEET_TOP_K', '20'))
+
+METHOD_KEYS = ['balanceTypeId', 'signatureMethodId', 'authenticationMethodId']
+
+_fleet_flight = SingleFlight(ttl=5)
+
+
+class FleetRollup:
+    """Aggregate get-all-consumption entries one at a time, keeping only the totals."""
+
+    def __init__(self, top_k):
+        self.top_k = top_k
+        self.nits = 0
+        self.total = 0
+        # Min-heap of (total, nit): the smallest of the current top K is replaced first
+        self._top = []
+        self.by_method = {key: Counter() for key in METHOD_KEYS}
+        self.by_signature_and_authentication = Counter()
+
+    def add(self, entry):
+        consumption = entry.get('consumption') or {}
+        total = consumption.get('totalAmountConsumption') or 0
+        self.nits += 1
+        self.total += total
+
+        item = (total, str(entry.get('nit')))
+        if len(self._top) < self.top_k:
+            heapq.heappush(self._top, item)
+        elif item > self._top[0]:
+            heapq.heapreplace(self._top, item)
+
+        by_balance, by_signature, by_authentication = (self.by_method[key] for key in METHOD_KEYS)
+        for method in consumption.get('firmaSeguroMethod') or []:
+            amount = method.get('amountConsumed') or 0
+            signature, authentication = method.get('signatureMethodId'), method.get('authenticationMethodId')
+            by_balance[method.get('balanceTypeId')] += amount
+            by_signature[signature] += amount
+            by_authentication[authentication] += amount
+            self.by_signature_and_authentication[(signature, authentication)] += amount
+
+    def to_json(self):
+        """Return the rollup as plain JSON (method ids sorted, top tenants by consumption)."""
+        return {
+            'nits': self.nits,
+            'total': self.total,
+            'top': [{'nit': nit, 'total': total} for total, nit in sorted(self._top, reverse=True)],
+            'by_method': {
+                key: [{'id': method_id, 'amount': amount} for method_id, amount in sorted(counter.items(), key=lambda item: str(item[0]))]
+                for key, counter in self.by_method.items()
+            },
+            'by_signature_and_authentication': [
+                {'signatureMethodId': signature, 'authenticationMethodId': authentication, 'amount': amount}
+                for (signature, authentication), amount in sorted(self.by_signature_and_authentication.items(), key=lambda item: str(item[0]))
+            ],
+        }
+
+
+def _fetch_fleet_rollup(initial_date, final_date):
+    headers = auth.auth_headers()
+    if not headers:
+        return None
+
+    all_consumptions_url = f'{url}/api/v1/Balance/get-all-consumption?initial_date={initial_date}&final_date={final_date}'
+    items, status_code = client.get_json_items(all_consumptions_url, headers, 'all consumptions')
+    if status_code == 401:
+        # The token was revoked or expired early; the next call signs in again
+        auth.token_manager.invalidate()
+    if items is None:
+        return None
+
+    # The payload is aggregated while it streams in; no flat list of every NIT is built
+    rollup = FleetRollup(FLEET_TOP_K)
+    try:
+        for entry in items:
+            rollup.add(entry)
+    except Exception as e:
+        # Never cache the rollup of a truncated payload
+        print(f"Failed to read all consumptions: {e}")
+        return None
+    return rollup.to_json()
+
+
+def get_fleet_rollup(initial_date, final_date, refresh=False):
+    """Return the consumption rollup of every NIT for a date range, served from the shared cache."""
+    key = f'fleet:{initial_date}:{final_date}'
+    if refresh:
+        rollup = _fetch_fleet_rollup(initial_date, final_date)
+        if rollup is not None:
+            shared_cache.set(key, rollup, FLEET_CACHE_TTL)
+        return rollup
+    return _fleet_flight.do(key, lambda: cached(key, FLEET_CACHE_TTL, lambda: _fetch_fleet_rollup(initial_date, final_date)))
@@ -0,0 +1,222 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from data import metrics
+from data.model import DIMENSIONS
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Keep the consumption of closed months on disk and answer long ranges from it
+HISTORY_STORE = os.getenv('HISTORY_STORE', 'true').lower() in ('1', 'true', 'yes')
+# SQLite file of the history store; unlike the cache it is never evicted, so keep it on a volume
+HISTORY_PATH = os.getenv('HISTORY_PATH', os.path.join(tempfile.gettempdir(), 'fs_dashboard_history.sqlite3'))
+
+# Rows that only mark where a status appears, so statuses without any breakdown keep their place
+STATUS_MARKER = ''
+
+
+def month_key(day):
+    """Return the YYYYMM integer of the month of a date."""
+    return day.year * 100 + day.month
+
+
+class HistoryStore:
+    """Materialized consumption rollups per NIT, user and closed month, plus per year once all its months are stored.
+
+    Rows are keyed by an id of (status, dimension, key) and remember where they first appeared
+    in the upstream responses, so a range adds up to the payload merge_payloads() would build,
+    in the same order. Full years are read from their yearly rollup instead of twelve months.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # (status, dimension, key) ids never change once assigned, so each process keeps them
+        self._ids = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # sqlite connections must not cross threads or a fork, so keep one per thread and process
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS consumption_month ('
+            ' nit TEXT NOT NULL,'
+            ' user_id INTEGER NOT NULL,'
+            ' month INTEGER NOT NULL,'
+            ' stored_at REAL NOT NULL,'
+            ' PRIMARY KEY (nit, user_id, month)) WITHOUT ROWID'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS consumption_key ('
+            ' id INTEGER PRIMARY KEY,'
+            ' status TEXT NOT NULL,'
+            ' dimension TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' UNIQUE (status, dimension, key))'
+        )
+        # Primary keys lead with the key id so each range is added up in index order
+        for table, period in (('consumption_month_rollup', 'month'), ('consumption_year_rollup', 'year')):
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} ('
+                ' nit TEXT NOT NULL,'
+                ' user_id INTEGER NOT NULL,'
+                ' key_id INTEGER NOT NULL,'
+                f' {period} INTEGER NOT NULL,'
+                ' count INTEGER NOT NULL,'
+                ' first_seen INTEGER NOT NULL,'
+                f' PRIMARY KEY (nit, user_id, key_id, {period})) WITHOUT ROWID'
+            )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _key_ids(self, conn, keys):
+        # Returns the ids and those assigned now, which are only remembered once the transaction commits
+        assigned = {}
+        missing = [key for key in set(keys) if key not in self._ids]
+        if missing:
+            conn.executemany('INSERT OR IGNORE INTO consumption_key (status, dimension, key) VALUES (?, ?, ?)', missing)
+            for key in missing:
+                assigned[key] = conn.execute(
+                    'SELECT id FROM consumption_key WHERE status = ? AND dimension = ? AND key = ?', key
+                ).fetchone()[0]
+        return [self._ids.get(key) or assigned[key] for key in keys], assigned
+
+    def _remember(self, keys):
+        with self._lock:
+            for key, key_id in keys.items():
+                self._ids[key] = key_id
+                self._keys[key_id] = key
+
+    def _keys_of(self, conn, key_ids):
+        missing = [key_id for key_id in key_ids if key_id not in self._keys]
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            rows = conn.execute(
+                f'SELECT id, status, dimension, key FROM consumption_key WHERE id IN ({", ".join("?" * len(batch))})', batch
+            ).fetchall()
+            self._remember({tuple(key): key_id for key_id, *key in rows})
+        return [self._keys[key_id] for key_id in key_ids]
+
+    def stored_months(self, nit, user_id, months):
+        """Return the subset of months (YYYYMM integers) already stored for the NIT and user."""
+        if not months:
+            return set()
+        try:
+            rows = self._connect().execute(
+                'SELECT month FROM consumption_month WHERE nit = ? AND user_id = ? AND month BETWEEN ? AND ?',
+                (nit, user_id, min(months), max(months)),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"History read failed: {e}")
+            return set()
+        stored = {row[0] for row in rows} & set(months)
+        for month in months:
+            metrics.observe_cache('history', month in stored)
+        return stored
+
+    def save_month(self, nit, user_id, month, payload):
+        """Store the get-all-consumption-by-nit payload of one closed month and refresh the rollup of its year."""
+        keys, counts = [], []
+        for entry in payload:
+            status = entry["processStatus"]
+            keys.append((status, STATUS_MARKER, STATUS_MARKER))
+            counts.append(0)
+            consumption = entry["consumption"]
+            for dimension in DIMENSIONS:
+                breakdown = consumption.get(dimension)
+                if not isinstance(breakdown, dict):
+                    continue
+                for key, count in breakdown.items():
+                    keys.append((status, dimension, str(key)))
+                    counts.append(count)
+
+        year = month // 100
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                key_ids, assigned = self._key_ids(conn, keys)
+                # A key repeated in one response is added up, keeping its first position
+                rows = {}
+                for position, (key_id, count) in enumerate(zip(key_ids, counts)):
+                    previous = rows.get(key_id)
+                    rows[key_id] = (previous[0] + count, previous[1]) if previous else (count, month * 1000000 + position)
+                conn.execute('DELETE FROM consumption_month_rollup WHERE nit = ? AND user_id = ? AND month = ?', (nit, user_id, month))
+                conn.executemany(
+                    'INSERT INTO consumption_month_rollup VALUES (?, ?, ?, ?, ?, ?)',
+                    [(nit, user_id, key_id, month, count, first_seen) for key_id, (count, first_seen) in rows.items()],
+                )
+                conn.execute('INSERT OR REPLACE INTO consumption_month VALUES (?, ?, ?, ?)', (nit, user_id, month, time.time()))
+
+                # Materialize the year once all its months are stored
+                conn.execute('DELETE FROM consumption_year_rollup WHERE nit = ? AND user_id = ? AND year = ?', (nit, user_id, year))
+                stored = conn.execute(
+                    'SELECT COUNT(*) FROM consumption_month WHERE nit = ? AND user_id = ? AND month BETWEEN ? AND ?',
+                    (nit, user_id, year * 100 + 1, year * 100 + 12),
+                ).fetchone()[0]
+                if stored == 12:
+                    conn.execute(
+                        'INSERT INTO consumption_year_rollup'
+                        ' SELECT nit, user_id, key_id, ?, SUM(count), MIN(first_seen) FROM consumption_month_rollup'
+                        ' WHERE nit = ? AND user_id = ? AND month BETWEEN ? AND ? GROUP BY key_id',
+                        (year, nit, user_id, year * 100 + 1, year * 100 + 12),
+                    )
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"History write failed: {e}")
+            return
+        self._remember(assigned)
+
+    def load(self, nit, user_id, months):
+        """Return the stored months added up as one payload, or None when the store cannot be read."""
+        months = set(months)
+        # Whole years come from their yearly rollup, the remaining months from the monthly one
+        years = sorted({month // 100 for month in months if all(month // 100 * 100 + m in months for m in range(1, 13))})
+        single_months = sorted(month for month in months if month // 100 not in years)
+
+        totals = {}
+        try:
+            conn = self._connect()
+            for table, period, values in (('consumption_year_rollup', 'year', years), ('consumption_month_rollup', 'month', single_months)):
+                if not values:
+                    continue
+                rows = conn.execute(
+                    f'SELECT key_id, SUM(count), MIN(first_seen) FROM {table}'
+                    f' WHERE nit = ? AND user_id = ? AND {period} IN ({", ".join("?" * len(values))}) GROUP BY key_id',
+                    (nit, user_id, *values),
+                ).fetchall()
+                for key_id, count, first_seen in rows:
+                    previous = totals.get(key_id)
+                    totals[key_id] = (previous[0] + count, min(previous[1], first_seen)) if previous else (count, first_seen)
+            ordered = sorted(totals.items(), key=lambda item: item[1][1])
+            keys = self._keys_of(conn, [key_id for key_id, _ in ordered])
+        except sqlite3.Error as e:
+            print(f"History read failed: {e}")
+            return None
+
+        merged = {}
+        for (status, dimension, key), (_, (count, _)) in zip(keys, ordered):
+            consumption = merged.setdefault(status, {dimension: {} for dimension in DIMENSIONS})
+            if dimension != STATUS_MARKER:
+                consumption[dimension][key] = count
+        return [{"processStatus": status, "consumption": consumption} for status, consumption in merged.items()]
+
+
+history_store = HistoryStore(HISTORY_PATH)
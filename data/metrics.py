@@ -0,0 +1,137 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# With several gunicorn workers every process writes its samples to files in this
+# directory and /metrics merges them (see gunicorn.conf.py); without it each worker
+# only reports its own samples
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+callback_duration = Histogram(
+    'dashboard_callback_duration_seconds', 'Time to answer a Dash callback request, including serialization.',
+    ['callback'], buckets=DURATION_BUCKETS,
+)
+callback_response_bytes = Histogram(
+    'dashboard_callback_response_bytes', 'Size of Dash callback responses as sent.',
+    ['callback'], buckets=SIZE_BUCKETS,
+)
+upstream_duration = Histogram(
+    'dashboard_upstream_request_duration_seconds', 'Time of upstream API requests, including retries.',
+    ['endpoint', 'status'], buckets=DURATION_BUCKETS,
+)
+upstream_response_bytes = Histogram(
+    'dashboard_upstream_response_bytes', 'Size of upstream API response bodies.',
+    ['endpoint'], buckets=SIZE_BUCKETS,
+)
+upstream_calls_per_view = Histogram(
+    'dashboard_upstream_calls_per_view', 'Upstream requests needed to load a page view.',
+    ['page'], buckets=(0, 1, 2, 3, 5, 8, 13, 21),
+)
+figure_build_duration = Histogram(
+    'dashboard_figure_build_duration_seconds', 'Time to build and encode a figure on a figure cache miss.',
+    ['metric'], buckets=DURATION_BUCKETS,
+)
+upstream_rejected = Counter(
+    'dashboard_upstream_rejected_total', 'Upstream requests refused without being sent, by endpoint and reason (breaker, deadline).',
+    ['endpoint', 'reason'],
+)
+cache_requests = Counter(
+    'dashboard_cache_requests_total', 'Cache lookups by cache and result.',
+    ['cache', 'result'],
+)
+
+# Upstream call counter of the page view being loaded, if any
+_view_calls = contextvars.ContextVar('view_calls', default=None)
+
+
+def endpoint_name(url):
+    """Return a low-cardinality endpoint label for an upstream URL, e.g. 'Company/GetAllUsersByNit'."""
+    parts = [part for part in urlsplit(url).path.split('/') if part]
+    if parts[:2] == ['api', 'v1']:
+        parts = parts[2:]
+    # Drop path parameters such as the nit
+    return '/'.join(part for part in parts if not part.isdigit()) or '/'
+
+
+def observe_upstream(url, status, seconds, size):
+    """Record one upstream request and count it for the current page view."""
+    endpoint = endpoint_name(url)
+    upstream_duration.labels(endpoint, str(status) if status else 'error').observe(seconds)
+    if size is not None:
+        upstream_response_bytes.labels(endpoint).observe(size)
+    calls = _view_calls.get()
+    if calls is not None:
+        calls[0] += 1
+
+
+def observe_rejected(endpoint, reason):
+    upstream_rejected.labels(endpoint, reason).inc()
+
+
+def observe_cache(cache, hit):
+    cache_requests.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+@contextmanager
+def page_view(page):
+    """Count the upstream requests made while loading a page view, including those of worker threads."""
+    calls = [0]
+    token = _view_calls.set(calls)
+    try:
+        yield
+    finally:
+        _view_calls.reset(token)
+        upstream_calls_per_view.labels(page).observe(calls[0])
+
+
+@contextmanager
+def timed_figure(metric):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        figure_build_duration.labels(metric).observe(time.perf_counter() - started)
+
+
+def _callback_name(payload):
+    # The first output identifies the callback, e.g. 'consumption-store.data'
+    output = (payload or {}).get('output', '')
+    return output.strip('.').split('...')[0] or 'unknown'
+
+
+def install(server, routes_pathname_prefix='/'):
+    """Time Dash callback requests and serve the metrics at {prefix}metrics."""
+    from flask import Response, g, request
+
+    update_path = f'{routes_pathname_prefix}_dash-update-component'
+
+    @server.before_request
+    def start_timer():
+        if request.path == update_path:
+            g.metrics_started = time.perf_counter()
+
+    @server.after_request
+    def observe_callback(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            callback = _callback_name(request.get_json(silent=True))
+            callback_duration.labels(callback).observe(time.perf_counter() - started)
+            if response.content_length is not None:
+                callback_response_bytes.labels(callback).observe(response.content_length)
+        return response
+
+    @server.route(f'{routes_pathname_prefix}metrics')
+    def metrics():
+        if PROMETHEUS_MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
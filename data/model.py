@@ -0,0 +1,101 @@
+# pandas is only imported when a table is built, so the data-load path and worker boot stay light
+
+# Breakdowns reported by get-all-consumption-by-nit for every process status
+DIMENSIONS = ['tipoCreacion', 'tipoProceso', 'tipoAutenticacion', 'consolidados']
+
+# Creation channels counted as processes in the KPI tiles
+PROCESS_CHANNELS = ['BackOffice', 'API']
+
+
+def encode_consumption(json_data):
+    """Normalize the API response in one pass into dictionary-encoded (status, dimension, key, count) columns.
+
+    The result is JSON-serializable and is what the page keeps in its dcc.Store.
+    """
+    statuses, keys = {}, {}
+    status_codes, dimension_codes, key_codes, counts = [], [], [], []
+
+    for entry in json_data:
+        consumption = entry["consumption"]
+
+        # Skip entries without a valid breakdown, as the API sends for some statuses
+        if not isinstance(consumption.get('tipoCreacion', {}), dict):
+            continue
+
+        status_code = statuses.setdefault(entry["processStatus"], len(statuses))
+        for dimension_code, dimension in enumerate(DIMENSIONS):
+            for key, count in (consumption.get(dimension) or {}).items():
+                status_codes.append(status_code)
+                dimension_codes.append(dimension_code)
+                key_codes.append(keys.setdefault(key, len(keys)))
+                counts.append(count)
+
+    return {
+        'statuses': list(statuses),
+        'keys': list(keys),
+        'status': status_codes,
+        'dimension': dimension_codes,
+        'key': key_codes,
+        'count': counts,
+    }
+
+
+def build_data_from_api(json_data):
+    """Normalize the API response into a long table of (status, dimension, key, count).
+
+    status, dimension and key are categoricals; statuses keep the order of the response.
+    """
+    return table_from_columns(encode_consumption(json_data))
+
+
+def table_from_columns(columns):
+    """Build the long table from the columns returned by encode_consumption()."""
+    import pandas as pd
+
+    return pd.DataFrame({
+        'status': pd.Categorical.from_codes(columns['status'], categories=columns['statuses']),
+        'dimension': pd.Categorical.from_codes(columns['dimension'], categories=DIMENSIONS),
+        'key': pd.Categorical.from_codes(columns['key'], categories=columns['keys']),
+        'count': pd.array(columns['count'], dtype='int64'),
+    })
+
+
+def get_statuses(table):
+    """Return the process statuses of the table in response order."""
+    return list(table['status'].cat.categories)
+
+
+def get_breakdown(table, status, dimension):
+    """Return the (key, count) rows of one dimension for one status, in response order."""
+    rows = table[(table['status'] == status) & (table['dimension'] == dimension)]
+    return rows[['key', 'count']].astype({'key': str}).reset_index(drop=True)
+
+
+def get_status_totals(table):
+    """Return the total of 'consolidados' per status, including statuses without any."""
+    consolidados = table[table['dimension'] == 'consolidados']
+    totals = consolidados.groupby('status', observed=False)['count'].sum()
+    return totals.rename_axis('processStatus').rename('totalConsolidado').reset_index().astype({'processStatus': str})
+
+
+def get_total_processes(table):
+    processes = table[
+        (table['status'] != 'Borrador')
+        & (table['dimension'] == 'tipoCreacion')
+        & table['key'].isin(PROCESS_CHANNELS)
+    ]
+    return int(processes['count'].sum())
+
+
+def get_total_processes_signed(table):
+    processes = table[
+        (table['status'] == 'Exitoso')
+        & (table['dimension'] == 'tipoCreacion')
+        & table['key'].isin(PROCESS_CHANNELS)
+    ]
+    return int(processes['count'].sum())
+
+
+def get_total_signatures(table):
+    signatures = table[(table['status'] != 'Borrador') & (table['dimension'] == 'tipoAutenticacion')]
+    return int(signatures['count'].sum())
@@ -0,0 +1,63 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Upstream requests a worker may have in flight at once
+UPSTREAM_MAX_PARALLEL = int(os.getenv('UPSTREAM_MAX_PARALLEL', '8'))
+# Seconds a caller waits for each concurrent upstream request
+UPSTREAM_FETCH_DEADLINE = float(os.getenv('UPSTREAM_FETCH_DEADLINE', '25'))
+
+_executors = {}
+_executors_pid = None
+_executors_lock = threading.Lock()
+
+
+def get_executor(pool='upstream', max_workers=None):
+    """Return the bounded thread pool of this worker process.
+
+    Tasks that fan out again (e.g. a consumption fetch split into month slices) must
+    use a different pool than their caller so a full pool can never wait on itself.
+    """
+    global _executors_pid
+    # Callbacks run on several threads, so only one of them may build a pool
+    with _executors_lock:
+        # Threads do not survive a fork, so build the pools once per process
+        if _executors_pid != os.getpid():
+            _executors.clear()
+            _executors_pid = os.getpid()
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(max_workers=max_workers or UPSTREAM_MAX_PARALLEL, thread_name_prefix=pool)
+        return _executors[pool]
+
+
+def fetch_concurrently(tasks, deadline=None, pool='upstream', max_workers=None):
+    """Run the callables in tasks ({name: fn}) concurrently and return {name: result}.
+
+    A task that fails or misses the deadline yields None; it keeps running in the
+    background so whatever it fetches still lands in the caches.
+    """
+    deadline = UPSTREAM_FETCH_DEADLINE if deadline is None else deadline
+    started = time.monotonic()
+    # Tasks run in the caller's context, so per-request state such as the page view metrics follows them
+    futures = {name: get_executor(pool, max_workers).submit(contextvars.copy_context().run, fn) for name, fn in tasks.items()}
+
+    results = {}
+    for name, future in futures.items():
+        remaining = max(deadline - (time.monotonic() - started), 0)
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            print(f"Upstream fetch '{name}' missed its {deadline}s deadline")
+            results[name] = None
+        except Exception as e:
+            print(f"Upstream fetch '{name}' failed: {e}")
+            results[name] = None
+    return results
@@ -1,47 +1,50 @@
-import requests
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
+from data import auth, client
+
 # Load environment variables from .env file
 load_dotenv()
 
 url = os.getenv('DEVURL')
 
-# Set date range
-current_date = datetime.now().date()
-initial_start_date = (current_date - timedelta(days=30)).strftime('%Y-%m-%d')
-initial_end_date = current_date.strftime('%Y-%m-%d')
 
-# The API endpoint
-auth = f"{url}/api/v1/Auth/SignIn"
-get_all_consumptions = f'{url}/api/v1/Balance/get-all-consumption?initial_date={initial_start_date}&final_date={current_date}'
-get_consumptions_by_nit = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit=1012402467&initial_date={initial_start_date}&final_date={current_date}'
+def default_date_range(days=30):
+    """Return the (initial_date, final_date) strings of the last `days` days."""
+    current_date = datetime.now().date()
+    initial_start_date = (current_date - timedelta(days=days)).strftime('%Y-%m-%d')
+    return initial_start_date, current_date.strftime('%Y-%m-%d')
+
+
+def get_all_consumptions(initial_date=None, final_date=None):
+    """Fetch the consumption of every NIT; defaults to the last 30 days."""
+    if not initial_date or not final_date:
+        initial_date, final_date = default_date_range()
 
-# Access environment variables
-email = os.getenv('EMAIL')
-password = os.getenv('PASSWORD')
+    headers = auth.auth_headers()
+    if not headers:
+        return None
 
-# data to auth
-data = {
-    "email": email,
-    "password": password
-}
+    get_all_consumptions_url = f'{url}/api/v1/Balance/get-all-consumption?initial_date={initial_date}&final_date={final_date}'
+    json_data, _ = client.get_json(get_all_consumptions_url, headers, 'all consumptions')
+    return json_data
 
-# A POST request to the API
-response = requests.post(auth, json=data)
 
-res_json = response.json()
-token = res_json['access_token']
+def get_consumptions_by_nit(nit, initial_date=None, final_date=None):
+    """Fetch the consumption of one NIT; defaults to the last 30 days."""
+    if not initial_date or not final_date:
+        initial_date, final_date = default_date_range()
 
-headers = {
-    "Authorization": f"Bearer {token}"
-}
+    headers = auth.auth_headers()
+    if not headers:
+        return None
 
+    get_consumptions_by_nit_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&initial_date={initial_date}&final_date={final_date}'
+    json_data, _ = client.get_json(get_consumptions_by_nit_url, headers, 'consumption by nit')
+    return json_data
 
-consumptions = requests.get(get_all_consumptions, headers=headers)
-consumptions_by_nit = requests.get(get_consumptions_by_nit, headers=headers)
 
-if __name__ == 'main':
+if __name__ == '__main__':
   # Print the response
-  print(consumptions.json())
+  print(get_all_consumptions())
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Sign in, open the upstream connection and import the charting stack in the background after boot
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'false').lower() in ('1', 'true', 'yes')
+
+_boot_started = time.perf_counter()
+_phases = []
+_warm_up = {'status': 'disabled', 'seconds': None}
+
+
+@contextmanager
+def timed(name):
+    """Record how long the wrapped startup phase takes."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - started))
+
+
+def report():
+    """Return the startup breakdown of this worker."""
+    return {
+        'pid': os.getpid(),
+        'phases': [{'name': name, 'seconds': round(seconds, 4)} for name, seconds in _phases],
+        'total_seconds': round(sum(seconds for _, seconds in _phases), 4),
+        'since_boot_seconds': round(time.perf_counter() - _boot_started, 4),
+        'warm_up': dict(_warm_up),
+    }
+
+
+def log_report():
+    breakdown = ', '.join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in _phases)
+    print(f"Startup of worker {os.getpid()}: {breakdown}")
+
+
+def warm_up():
+    """Pay the first-request costs ahead of time: imports, sign-in and the upstream connection."""
+    started = time.perf_counter()
+    _warm_up['status'] = 'running'
+    try:
+        import pandas  # noqa: F401
+        import plotly.express  # noqa: F401
+
+        from data import auth
+        auth.get_token()
+        _warm_up['status'] = 'done'
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        _warm_up['status'] = 'failed'
+    _warm_up['seconds'] = round(time.perf_counter() - started, 4)
+
+
+def start_warm_up():
+    """Run warm_up() in a background thread when WARMUP_ON_START is set."""
+    if WARMUP_ON_START:
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
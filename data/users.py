@@ -0,0 +1,110 @@
+import bisect
+import os
+import unicodedata
+
+from dotenv import load_dotenv
+
+from data import auth, client
+from data.cache import cached, shared_cache
+from data.coalesce import SingleFlight
+
+# Load environment variables from .env file
+load_dotenv()
+
+url = os.getenv('DEVURL')
+
+# Seconds a NIT's user list is kept in the shared cache
+USERS_CACHE_TTL = float(os.getenv('USERS_CACHE_TTL', '600'))
+# Matches returned per search in the users dropdown
+USERS_SEARCH_LIMIT = int(os.getenv('USERS_SEARCH_LIMIT', '20'))
+
+_users_flight = SingleFlight(ttl=5)
+# Search indexes are kept per worker as long as the user lists in the shared cache
+_index_flight = SingleFlight(ttl=USERS_CACHE_TTL)
+
+
+def _fetch_users_by_nit(nit):
+    headers = auth.auth_headers()
+    if not headers:
+        return None
+
+    json_data, status_code = client.get_json(f'{url}/api/v1/Company/GetAllUsersByNit/{nit}', headers, 'users')
+    if status_code == 401:
+        # The token was revoked or expired early; the next call signs in again
+        auth.token_manager.invalidate()
+    return json_data
+
+
+def get_users_by_nit(nit, refresh=False):
+    """Return the parsed GetAllUsersByNit payload, served from the shared cache unless refresh=True."""
+    nit = str(nit).strip() if nit else ''
+    if not nit:
+        return None
+    if refresh:
+        users_by_nit = _fetch_users_by_nit(nit)
+        if users_by_nit is not None:
+            shared_cache.set(f'users:{nit}', users_by_nit, USERS_CACHE_TTL)
+        return users_by_nit
+    return _users_flight.do(nit, lambda: cached(f'users:{nit}', USERS_CACHE_TTL, lambda: _fetch_users_by_nit(nit)))
+
+
+def normalize_name(text):
+    """Casefold and strip accents so 'Peña' matches 'pena'."""
+    decomposed = unicodedata.normalize('NFKD', str(text or '')).casefold()
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).strip()
+
+
+class UserIndex:
+    """Prefix and substring search over the fullName of a NIT's users."""
+
+    def __init__(self, users):
+        entries = sorted((normalize_name(user.get('fullName')), user.get('fullName') or '', user.get('id')) for user in users)
+        self._names = [name for name, _, _ in entries]
+        # The dropdown filters the options again in the browser; 'search' lets unaccented queries through
+        self._options = [{'label': label, 'value': user_id, 'search': f'{label} {name}'} for name, label, user_id in entries]
+
+    def __len__(self):
+        return len(self._options)
+
+    def search(self, text, limit):
+        """Return up to limit dropdown options: names starting with text first, then names containing it."""
+        text = normalize_name(text)
+        if not text:
+            return self._options[:limit]
+
+        # Names are sorted, so the prefix matches are one contiguous run
+        start = bisect.bisect_left(self._names, text)
+        matches = []
+        for position in range(start, len(self._names)):
+            if len(matches) >= limit or not self._names[position].startswith(text):
+                break
+            matches.append(position)
+
+        seen = set(matches)
+        for position, name in enumerate(self._names):
+            if len(matches) >= limit:
+                break
+            if position not in seen and text in name:
+                matches.append(position)
+        return [self._options[position] for position in matches]
+
+
+def get_user_index(nit):
+    """Return the search index of a NIT's users, or None when the list cannot be loaded."""
+    nit = str(nit).strip() if nit else ''
+    if not nit:
+        return None
+
+    def build():
+        users_by_nit = get_users_by_nit(nit)
+        return UserIndex(users_by_nit) if users_by_nit is not None else None
+
+    return _index_flight.do(nit, build)
+
+
+def search_users(nit, text, limit=None):
+    """Return the dropdown options of the users of a NIT whose name matches text."""
+    index = get_user_index(nit)
+    if index is None:
+        return []
+    return index.search(text, limit or USERS_SEARCH_LIMIT)
@@ -0,0 +1,123 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from data.cache import shared_cache
+from data.consumption import STALE_WHILE_REVALIDATE, bogota_tz, get_consumption_by_nit, revalidate_consumption
+from data.parallel import fetch_concurrently
+from data.users import get_users_by_nit
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Keep the data of recently viewed NITs warm in the shared cache
+CACHE_WARMER = os.getenv('CACHE_WARMER', 'true').lower() in ('1', 'true', 'yes')
+# Seconds between warm-up cycles, randomized by +/- WARMER_JITTER
+WARMER_INTERVAL = float(os.getenv('WARMER_INTERVAL', '240'))
+WARMER_JITTER = float(os.getenv('WARMER_JITTER', '0.2'))
+# Upstream requests the warmer may have in flight at once
+WARMER_MAX_PARALLEL = int(os.getenv('WARMER_MAX_PARALLEL', '2'))
+# Seconds a viewed NIT stays in the warm set
+WARM_NIT_TTL = float(os.getenv('WARM_NIT_TTL', '3600'))
+# NITs that are always kept warm, comma separated
+WARM_NITS = [nit.strip() for nit in os.getenv('WARM_NITS', '').split(',') if nit.strip()]
+
+_started_pid = None
+
+
+def default_date_range():
+    """Return the 30-day window the NIT page opens with."""
+    current_date = datetime.now(bogota_tz).date()
+    return (current_date - timedelta(days=30)).strftime('%Y-%m-%d'), current_date.strftime('%Y-%m-%d')
+
+
+def track_view(nit, user_id):
+    """Add a (nit, user) pair to the warm set shared by all workers."""
+    if not CACHE_WARMER or not nit:
+        return
+    key = f'warm:{nit}:{user_id or 0}'
+    # Page loads only read the cache until half of the entry's time is gone, sparing a write and an eviction scan each
+    added_at = shared_cache.get(key)
+    if isinstance(added_at, (int, float)) and time.time() - added_at < WARM_NIT_TTL / 2:
+        return
+    shared_cache.set(key, time.time(), WARM_NIT_TTL)
+
+
+def warm_set():
+    """Return the (nit, user) pairs to keep warm."""
+    pairs = {(nit, 0) for nit in WARM_NITS}
+    for key in shared_cache.keys('warm:'):
+        _, nit, user_id = key.split(':', 2)
+        pairs.add((nit, int(user_id)))
+    return sorted(pairs)
+
+
+def warm_once():
+    """Refetch consumption and users of the warm set for the default window; return (loaded, failed)."""
+    start_date, end_date = default_date_range()
+    pairs = warm_set()
+
+    # Month slices go through a pool of their own, so the warmer never takes the slots of page loads
+    slices = {'pool': 'warmer-slices', 'max_workers': WARMER_MAX_PARALLEL}
+    tasks = {}
+    for nit, user_id in pairs:
+        if STALE_WHILE_REVALIDATE:
+            # Also keeps the data served while the page revalidates young
+            tasks[f'consumption:{nit}:{user_id}'] = lambda nit=nit, user_id=user_id: revalidate_consumption(nit, user_id, start_date, end_date, **slices)
+        else:
+            tasks[f'consumption:{nit}:{user_id}'] = lambda nit=nit, user_id=user_id: get_consumption_by_nit(nit, user_id, start_date, end_date, refresh=True, **slices)
+    for nit in {nit for nit, _ in pairs}:
+        tasks[f'users:{nit}'] = lambda nit=nit: get_users_by_nit(nit, refresh=True)
+
+    results = fetch_concurrently(tasks, deadline=WARMER_INTERVAL, pool='warmer', max_workers=WARMER_MAX_PARALLEL)
+    failed = sum(1 for result in results.values() if result is None)
+    loaded = len(results) - failed
+    # Only the configured NITs count for readiness; a viewed NIT that no longer exists must not hold it back
+    configured = {f'consumption:{nit}:0' for nit in WARM_NITS} | {f'users:{nit}' for nit in WARM_NITS}
+    configured_failed = sum(1 for name in configured if results.get(name) is None)
+
+    shared_cache.set('warmer:status', {
+        'nits': len(pairs), 'loaded': loaded, 'failed': failed, 'configured_failed': configured_failed, 'finished_at': time.time(),
+    }, WARMER_INTERVAL * 3)
+    return loaded, failed
+
+
+def _jittered(seconds):
+    return seconds * random.uniform(1 - WARMER_JITTER, 1 + WARMER_JITTER)
+
+
+def _run():
+    # Stagger the first cycle so freshly booted workers do not all start together
+    time.sleep(_jittered(min(WARMER_INTERVAL, 10)))
+    while True:
+        # Only one worker warms per cycle: the first to take the lease
+        if shared_cache.add('warmer:lease', os.getpid(), WARMER_INTERVAL * (1 - WARMER_JITTER)):
+            try:
+                loaded, failed = warm_once()
+                print(f"Cache warmer loaded {loaded} entries, {failed} failed")
+            except Exception as e:
+                print(f"Cache warmer failed: {e}")
+        time.sleep(_jittered(WARMER_INTERVAL))
+
+
+def start():
+    """Start the warmer thread of this worker when CACHE_WARMER is enabled."""
+    global _started_pid
+    if CACHE_WARMER and _started_pid != os.getpid():
+        _started_pid = os.getpid()
+        threading.Thread(target=_run, name='cache-warmer', daemon=True).start()
+
+
+def readiness():
+    """Return whether the last warm-up cycle loaded the configured WARM_NITS."""
+    if not CACHE_WARMER:
+        return {'ready': True, 'warmer': 'disabled'}
+
+    status = shared_cache.get('warmer:status')
+    if status is None:
+        return {'ready': False, 'warmer': 'pending'}
+    return {'ready': status.get('configured_failed', 0) == 0, 'warmer': status}
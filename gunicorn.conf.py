@@ -0,0 +1,22 @@
+# Gunicorn reads this file from the working directory on start
+import os
+import shutil
+import tempfile
+
+# Workers write their Prometheus samples here so /metrics can aggregate all of them.
+# Set before the workers import the app, which is when prometheus_client reads it.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'fs_dashboard_metrics'))
+
+
+def on_starting(server):
+    # Samples of a previous run would otherwise be added to the new ones
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the live gauges of the dead worker; its counters and histograms are kept
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,73 +1,125 @@
-# # Import packages
-# import dash
-# from dash import dcc, html, callback
-# from dash.dependencies import Input, Output
-# import pandas as pd
-# import plotly.express as px
-
-# # Local import
-# from data import report
-
-# # Load JSON data
-# json_data = report.consumptions.json()
-
-# # Flatten the JSON data into a DataFrame
-# flat_data = []
-# for entry in json_data:
-#     nit = entry["nit"]
-#     total_amount_consumption = entry["consumption"]["totalAmountConsumption"]
-    
-#     # Flatten the nested "firmaSeguroMethod"
-#     for method in entry["consumption"]["firmaSeguroMethod"]:
-#         flat_data.append({
-#             "nit": nit,
-#             "totalAmountConsumption": total_amount_consumption,
-#             "balanceTypeId": method["balanceTypeId"],
-#             "signatureMethodId": method["signatureMethodId"],
-#             "authenticationMethodId": method["authenticationMethodId"],
-#             "amountConsumed": method["amountConsumed"]
-#         })
-
-# # Convert the flattened data into a DataFrame
-# df = pd.DataFrame(flat_data)
-
-# # Register page
-# dash.register_page(__name__)
-
-# # Layout
-# layout = html.Div([
-#     html.H1("Consumos por NIT"),
-    
-#     # Dropdown for selecting NIT
-#     dcc.Dropdown(
-#         id='nit-dropdown',
-#         options=[{'label': nit, 'value': nit} for nit in df['nit'].unique()],
-#         value=df['nit'].unique()[0],  # Set the default value
-#         clearable=False
-#     ),
-    
-#     # Graph component to display the data
-#     dcc.Graph(id='consumption-graph'),
-# ])
-
-# # Callback to update the graph based on the selected NIT
-# @callback(
-#     Output('consumption-graph', 'figure'),
-#     Input('nit-dropdown', 'value')
-# )
-# def update_graph(selected_nit):
-#     # Filter data based on selected NIT
-#     filtered_df = df[df['nit'] == selected_nit]
-
-#     # Bar chart showing the amount consumed per signature method
-#     fig = px.bar(
-#         filtered_df,
-#         x='signatureMethodId',
-#         y='amountConsumed',
-#         color='balanceTypeId',
-#         barmode='group',
-#         title=f'Consumos para el NIT {selected_nit}',
-#         labels={'signatureMethodId': 'Metodo de Firma', 'amountConsumed': 'Cantidad Consumida'}
-#     )
-
-#     return fig
+# Import packages
+import dash
+from dash import dcc, html, callback
+from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
+from datetime import datetime, timedelta
+import logging
+
+# Local import (plotly is imported where used so worker boot stays light)
+from data import metrics
+from data.consumption import bogota_tz
+from data.fleet import get_fleet_rollup, METHOD_KEYS
+from data.parallel import fetch_concurrently
+from data.figures import create_top_nits_figure, create_fleet_method_figure, create_fleet_breakdown_figure, empty_figure
+
+logger = logging.getLogger(__name__)
+
+# Set date range
+current_date = datetime.now(bogota_tz).date()
+initial_start_date = (current_date - timedelta(days=30)).strftime('%Y-%m-%d')
+initial_end_date = current_date.strftime('%Y-%m-%d')
+
+# Register page
+dash.register_page(__name__)
+
+tile_style = {'display': 'inline-block', 'width': '200px', 'padding': '10px', 'margin-bottom': '20px', 'color': '#fff', 'text-align': 'center'}
+box_style = {'background': '#fff', 'display': 'inline-block', 'border': '1px solid #ccc'}
+
+# Layout
+layout = html.Div([
+    html.Div([
+        html.H1('Consumo de todos los NIT', style={'color': '#173179', 'text-transform': 'uppercase', 'text-align': 'left', 'margin': '0', 'font-size': '22px', 'flex-grow': '1'}),
+        html.Div([
+            html.Div(id='fleet-total-nits', style={**tile_style, 'background': '#2b5e7f'}),
+            html.Div(id='fleet-total-consumption', style={**tile_style, 'background': '#72d06a'}),
+        ], style={'display': 'flex', 'column-gap': '20px'}),
+        html.Div([
+            html.Span('Fecha', className='filter_label'),
+            dcc.DatePickerRange(
+                id='fleet-date-range',
+                start_date=initial_start_date,
+                end_date=initial_end_date,
+                max_date_allowed=current_date,
+                display_format='YYYY-MM-DD',
+            ),
+        ], style={'display': 'flex', 'flex-direction': 'column'}),
+    ], style={'display': 'flex', 'justify-content': 'flex-end', 'column-gap': '20px', 'margin-top': '20px', 'margin-bottom': '20px'}),
+
+    html.Div([
+        html.Div([
+            dcc.Loading(type="dot", children=dcc.Graph(id='fleet-top-nits', style={'height': '500px'})),
+        ], style={**box_style, 'width': '64%'}),
+        html.Div([
+            html.H3('NIT con mayor consumo', style={'padding': '10px', 'font-size': '16px', 'color': '#173179'}),
+            html.Div(id='fleet-top-links', style={'padding': '0 10px', 'max-height': '440px', 'overflow-y': 'auto'}),
+        ], style={**box_style, 'width': '34%'}),
+    ], className="box"),
+
+    html.Div([
+        html.Div([
+            dcc.Loading(type="dot", children=dcc.Graph(id=f'fleet-{key}', style={'height': '350px'})),
+        ], style={**box_style, 'width': '33%'})
+        for key in METHOD_KEYS
+    ], className="box"),
+
+    html.Div([
+        html.Div([
+            dcc.Loading(type="dot", children=dcc.Graph(id='fleet-breakdown', style={'height': '400px'})),
+        ], style={**box_style, 'width': '100%'}),
+    ], className="box"),
+
+    # Rollup of the selected date range; only these totals travel to the browser, never the per-NIT payload
+    dcc.Store(id='fleet-store'),
+])
+
+# Callback to load the rollup of every NIT for the date range; aggregated server side and cached
+@callback(
+    Output('fleet-store', 'data'),
+    Input('fleet-date-range', 'start_date'),
+    Input('fleet-date-range', 'end_date'),
+)
+def load_fleet_data(start_date, end_date):
+    if not start_date or not end_date:
+        raise PreventUpdate
+
+    with metrics.page_view('all_nits'):
+        results = fetch_concurrently({'fleet': lambda: get_fleet_rollup(start_date, end_date)})
+
+    logger.info(f'Fleet consumption: {start_date} {end_date}')
+    return {'rollup': results['fleet']}
+
+# Callback to render the tiles and charts from the loaded rollup
+@callback(
+    Output('fleet-total-nits', 'children'),
+    Output('fleet-total-consumption', 'children'),
+    Output('fleet-top-links', 'children'),
+    Output('fleet-top-nits', 'figure'),
+    *[Output(f'fleet-{key}', 'figure') for key in METHOD_KEYS],
+    Output('fleet-breakdown', 'figure'),
+    Input('fleet-store', 'data'),
+)
+def update_fleet(data):
+    if not data:
+        raise PreventUpdate
+
+    rollup = data['rollup']
+    if not rollup:
+        fig = empty_figure("Error: Failed to fetch data")
+        return '', '', [], fig, *[fig for _ in METHOD_KEYS], fig
+
+    total_nits_html = html.Div([html.Span('NIT con consumo'), html.H3(f"{rollup['nits']}")])
+    total_consumption_html = html.Div([html.Span('Consumo total'), html.H3(f"{rollup['total']}")])
+    top_links = html.Ol([
+        html.Li(dcc.Link(f"{entry['nit']} ({entry['total']})", href=dash.get_relative_path(f"/by-nit?nit={entry['nit']}&user=0")))
+        for entry in rollup['top']
+    ])
+
+    return (
+        total_nits_html,
+        total_consumption_html,
+        top_links,
+        create_top_nits_figure(rollup),
+        *[create_fleet_method_figure(rollup, key) for key in METHOD_KEYS],
+        create_fleet_breakdown_figure(rollup),
+    )
@@ -1,137 +1,51 @@
 # Import packages
 import dash
-from dash import dcc, html, callback
-from dash.dependencies import Input, Output
-import pandas as pd
-import plotly.express as px
-from urllib.parse import parse_qs, urlparse
+from dash import dcc, html, dash_table, callback, clientside_callback, ClientsideFunction, ctx, no_update
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+from urllib.parse import parse_qs, urlencode
+import contextvars
 import locale
 from datetime import datetime, timedelta
 import pytz
-import requests
 import os
-from dotenv import load_dotenv
+import time
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
-
-url = os.getenv('DEVURL')
-
-# Local import
-from data import report
+# Render the status filter, KPI tiles and charts in the browser instead of on the server
+CLIENTSIDE_RENDERING = os.getenv('CLIENTSIDE_RENDERING', 'false').lower() in ('1', 'true', 'yes')
+# Seconds between checks for fresher data while stale data is shown (STALE_WHILE_REVALIDATE)
+SWR_POLL_INTERVAL = float(os.getenv('SWR_POLL_INTERVAL', '2'))
+
+# Local import (pandas and plotly are imported where used so worker boot stays light)
+from data.consumption import STALE_WHILE_REVALIDATE, get_consumption_or_last_known, get_consumption_swr, get_last_known_consumption
+from data.users import get_user_index, search_users
+from data import metrics
+from data.parallel import UPSTREAM_FETCH_DEADLINE, get_executor
+from data.warmer import track_view
+from data.figures import create_figure_from_data, empty_figure
+from data.drilldown import COLUMNS, DRILLDOWN_PAGE_SIZE, get_drilldown_table, query_rows
+from data.export import EXPORT_FORMATS
+from data.model import (
+    encode_consumption,
+    table_from_columns,
+    get_total_processes,
+    get_total_processes_signed,
+    get_total_signatures,
+)
 
 # Set locale to Spanish
 locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
 
-# Utility function for authentication
-def authenticate():
-    """Authenticate and return a token."""
-    email = os.getenv('EMAIL')
-    password = os.getenv('PASSWORD')
-    auth_url = f"{url}/api/v1/Auth/SignIn"
-    response = requests.post(auth_url, json={"email": email, "password": password})
-
-    if response.status_code == 200:
-        try:
-            return response.json().get('access_token')
-        except requests.exceptions.JSONDecodeError:
-            print("Failed to decode authentication response")
-    else:
-        print(f"Authentication failed with status code {response.status_code}")
-    return None
-
-# Utility function for fetching data
-def fetch_data(api_endpoint, headers):
-    """Fetch data from an API endpoint with given headers."""
-    response = requests.get(api_endpoint, headers=headers)
-    if response.status_code == 200:
-        try:
-            return response.json()
-        except requests.exceptions.JSONDecodeError:
-            print("Failed to decode response")
-    else:
-        print(f"Failed to fetch data with status code {response.status_code}")
-    return None
-
-# Function to build data from API response
-def build_data_from_api(json_data):
-    """Convert JSON response to DataFrame."""
-
-    data = []
-    for entry in json_data:
-        process_status = entry["processStatus"]
-        consumption = entry["consumption"]
-
-        # Extract fields as is
-        tipo_creacion = consumption.get('tipoCreacion', {})
-        
-        # Append data if valid
-        if isinstance(tipo_creacion, dict):
-            data.append({
-                "processStatus": process_status,
-                "totalConsolidado": sum(consumption.get('consolidados', {}).values()),
-                "tipoCreacion": tipo_creacion,
-                "tipoProceso": consumption.get('tipoProceso', {}),
-                "tipoAutenticacion": consumption.get('tipoAutenticacion', {}),
-                "consolidados": consumption.get('consolidados', {})
-            })
-
-    return pd.DataFrame(data)
-
-def get_total_processes(json_data):
-    total_processes = 0
-
-    for entry in json_data:
-        process_status = entry["processStatus"]
-        
-        # Increment the count if the status is not 'Borrador'
-        if process_status != 'Borrador':
-            tipo_creacion = entry['consumption'].get('tipoCreacion', {})
-            total_processes += tipo_creacion.get('BackOffice', 0) + tipo_creacion.get('API', 0)
-
-    return total_processes
-
-def get_total_processes_signed(json_data):
-    total_processes = 0
-
-    for entry in json_data:
-        process_status = entry["processStatus"]
-        
-        # Increment the count if the status is not 'Borrador'
-        if process_status == 'Exitoso':
-            tipo_creacion = entry['consumption'].get('tipoCreacion', {})
-            total_processes += tipo_creacion.get('BackOffice', 0) + tipo_creacion.get('API', 0)
-
-    return total_processes
-
-def get_total_signatures(json_data):
-    # Initialize a dictionary to hold the sums
-    tipo_autenticacion_sum = {'Llamada': 0, 'SMS': 0, 'Email': 0, 'WhatsApp': 0}
-    total_sum = 0  # Variable to hold the total sum of all methods
-
-    data = []
-    for entry in json_data:
-        process_status = entry["processStatus"]
-        consumption = entry["consumption"]
-
-        if process_status != 'Borrador':
-            # Sum the tipoAutenticacion counts
-            for method, count in consumption['tipoAutenticacion'].items():
-                tipo_autenticacion_sum[method] += count
-                total_sum += count  # Add to total sum
-
-        # Extract fields as is
-        tipo_creacion = consumption.get('tipoCreacion', {})
-        
-    print(tipo_autenticacion_sum)
-    print("Total sum of all tipoAutenticacion:", total_sum)
+def figure_template():
+    """Return the active plotly template for the clientside renderer."""
+    import plotly.io as pio
 
-    return total_sum
+    return pio.templates[pio.templates.default].to_plotly_json()
 
 # Define the Bogotá time zone
 bogota_tz = pytz.timezone('America/Bogota')
@@ -148,7 +62,11 @@ dash.register_page(__name__)
 # Layout
 layout = html.Div([
     html.Div([
-        html.H1('Mis consumos', style={'color': '#173179', 'text-transform': 'uppercase', 'text-align': 'left', 'margin': '0', 'font-size': '22px', 'flex-grow': '1'}),
+        html.Div([
+            html.H1('Mis consumos', style={'color': '#173179', 'text-transform': 'uppercase', 'text-align': 'left', 'margin': '0', 'font-size': '22px'}),
+            # When the data was fetched from the upstream (STALE_WHILE_REVALIDATE)
+            html.Span(id='data-as-of', className='data-as-of'),
+        ], style={'flex-grow': '1'}),
         html.Div([
             html.Div(id='total_signatures', style={'display': 'inline-block', 'width': '150px', 'padding': '10px', 'margin-bottom': '20px', 'color': '#fff', 'background': '#72d06a', 'text-align': 'center'}),
             html.Div(id='total_processes', style={'display': 'inline-block', 'width': '150px', 'padding': '10px', 'margin-bottom': '20px', 'color': '#fff', 'background': '#2b5e7f', 'text-align': 'center'}),
@@ -240,6 +158,42 @@ layout = html.Div([
         
     ], className="box"),
 
+    # Drill-down of the loaded data; paging, sorting and filtering run on the server, one page at a time
+    html.Div([
+        dash_table.DataTable(
+            id='drilldown-table',
+            columns=COLUMNS,
+            page_current=0,
+            page_size=DRILLDOWN_PAGE_SIZE,
+            page_action='custom',
+            sort_action='custom',
+            sort_mode='multi',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
+            style_header={'fontWeight': 'bold'},
+            style_cell={'textAlign': 'left', 'padding': '5px'},
+        ),
+        # Plain links rather than dcc.Download, which would send the whole file base64-encoded
+        # in a callback response; the export route streams it straight to the browser
+        html.Div([
+            html.A(f'Descargar {export_format.upper()}', id=f'export-{export_format}', download='', style={'margin-right': '20px'})
+            for export_format in EXPORT_FORMATS
+        ], style={'margin-top': '10px'}),
+    ], style={'background': '#fff', 'border': '1px solid #ccc', 'padding': '10px', 'margin-bottom': '20px'}),
+
+    # Query of the loaded data (nit, user and range); the drill-down reads the rows from the server cache with it
+    dcc.Store(id='drilldown-query'),
+
+    # Normalized dataset for the selected nit, user and date range; the render callbacks read from it
+    dcc.Store(id='consumption-store'),
+
+    # Plotly template used by the clientside renderer so its figures match plotly.express ones
+    dcc.Store(id='figure-template', data=figure_template() if CLIENTSIDE_RENDERING else None),
+
+    # Polls for the refreshed data while stale data is shown; disabled otherwise
+    dcc.Interval(id='swr-interval', interval=SWR_POLL_INTERVAL * 1000, disabled=True),
+
     # Dummy component to use as an Input trigger for the callback
     dcc.Interval(
         id='interval-component',
@@ -248,536 +202,262 @@ layout = html.Div([
     )
 ])
 
-# Generic callback for fetching data and updating visualizations
-def create_figure_from_data(df, selected_status, metric):
-    # Filter data and create figure based on chart type
-    if metric == 'auth_method':
-        filtered_df = df[df['processStatus'] == selected_status]
-        # Extract the tipoCreacion dictionary
-        tipo_auth_dict = filtered_df.iloc[0]['tipoAutenticacion']
-        
-        # Convert the dictionary to a DataFrame
-        auth_df = pd.DataFrame(list(tipo_auth_dict.items()), columns=['Tipo Autenticacion', 'Count'])
-
-        fig = px.bar(
-            auth_df,
-            x='Tipo Autenticacion',
-            y='Count',
-            labels={'x': 'Método', 'Count': 'Total'},
-            title=f'Firmas por tipo de Autenticación',
-            color='Tipo Autenticacion',
-            text='Count',
-        )
-
-        # Update the layout to position the text on top of each bar
-        fig.update_traces(textposition='inside')   
-
-        return fig
-    elif metric == 'creation_type':
-        filtered_df = df[df['processStatus'] == selected_status]
-        # Check if there's any data available
-        if filtered_df.empty:
-            # If no data available, return an empty figure with a message
-            fig = px.pie(
-                names=['No Data Available'],
-                values=[1],
-                title=f'Tipo Creacion for Status: {selected_status}',
-                hole=0.4
-            )
-        else:
-            # Extract the tipoCreacion dictionary
-            tipo_creacion_dict = filtered_df.iloc[0]['tipoCreacion']
-            
-            # Convert the dictionary to a DataFrame
-            donut_df = pd.DataFrame(list(tipo_creacion_dict.items()), columns=['Tipo Creacion', 'Count'])
-            
-            # Create the donut chart
-            fig = px.pie(
-                donut_df,
-                names='Tipo Creacion',
-                values='Count',
-                title=f'Procesos por tipo de creación',
-                hole=0.4  # Create a donut chart
-            )
-
-            if donut_df['Count'].sum() == 0:
-                fig.add_annotation(
-                    text=f"No hay resultados para {selected_status}",
-                    font=dict(
-                        family="Arial, sans-serif",
-                        size=18,
-                        color="#000"
-                    ),
-                    align="center",
-                    xref="paper", 
-                    yref="paper",
-                    x=0.1, 
-                    y=0.5, 
-                    showarrow=False
-                )
-            
-        return fig
-    elif metric == 'process_type':
-        # Filter the data based on the selected process status
-        filtered_df = df[df['processStatus'] == selected_status]
-
-        # Check if there's any data available
-        if filtered_df.empty:
-            # If no data available, return an empty figure with a message
-            fig = px.pie(
-                names=['No Data Available'],
-                values=[1],
-                title=f'Tipo Creacion for Status: {selected_status}',
-                hole=0.4
-            )
-        else:
-            # Extract the tipoCreacion dictionary
-            tipo_proceso_dict = filtered_df.iloc[0]['tipoProceso']
-            
-            # Convert the dictionary to a DataFrame
-            donut_df = pd.DataFrame(list(tipo_proceso_dict.items()), columns=['Tipo Proceso', 'Count'])
-            
-            # Create the donut chart
-            fig = px.pie(
-                donut_df,
-                names='Tipo Proceso',
-                values='Count',
-                title=f'Procesos por tipo de proceso',
-                hole=0.4  # Create a donut chart
-            )
-
-            if donut_df['Count'].sum() == 0:
-                fig.add_annotation(
-                    text=f"No hay resultados para {selected_status}",
-                    font=dict(
-                        family="Arial, sans-serif",
-                        size=18,
-                        color="#000"
-                    ),
-                    align="center",
-                    xref="paper", 
-                    yref="paper",
-                    x=0.1, 
-                    y=0.5, 
-                    showarrow=False
-                )
-            
-        return fig
-
-    elif metric == 'consolidated':
-        filtered_df = df[df['processStatus'] == selected_status]
-
-        consolidados_dict = filtered_df.iloc[0]['consolidados']
-        consolidados_df = pd.DataFrame(list(consolidados_dict.items()), columns=['Month', 'Count'])
-        
-        # Convert 'Month' to datetime format including year
-        consolidados_df['Month'] = pd.to_datetime(consolidados_df['Month'] + '01', format='%Y%m%d')
-
-        # Format 'Month' to show month and year
-        consolidados_df['Month'] = consolidados_df['Month'].dt.strftime('%B %Y')
-
-        fig = px.line(
-            consolidados_df, 
-            x="Month", 
-            y="Count",
-            title='Procesos por mes',
-            labels={'Month': 'Mes', 'Count': 'Total mes'},
-            text='Count'
-        )
-
-        # Add text labels on the line chart
-        fig.update_traces(textposition="middle left")
-        
-        return fig
-
-    # Add more chart types as needed
-    return px.bar()
-
+def parse_query(search):
+    """Return the 'nit' and 'user' parameters of the page URL."""
+    if not search:
+        return None, None
+    # Remove the leading '?' character from the search string
+    query_params = parse_qs(search.lstrip('?'))
+    # parse_qs returns lists, so use [0] to get the value
+    return query_params.get('nit', [None])[0], query_params.get('user', [None])[0]
+
+def user_dropdown_class(user):
+    """Return the users dropdown class; the dropdown is only shown when the URL has user=0."""
+    return 'show-dropdown' if user == '0' else 'hidden-dropdown'
+
+def format_as_of(fetched_at, revalidating):
+    """Return the 'data as of' label for data fetched at the given unix time."""
+    if not fetched_at:
+        return ''
+    label = f"Datos al {datetime.fromtimestamp(fetched_at, bogota_tz).strftime('%Y-%m-%d %H:%M:%S')}"
+    return f'{label} (actualizando…)' if revalidating else label
+
+def build_dataset(nit, json_data):
+    """Return the store content for a consumption payload; the render callbacks rebuild the typed table from it."""
+    if json_data is None:
+        return {'nit': nit, 'table': None}
+    return {'nit': nit, 'table': encode_consumption(json_data)}
+
+# Callback to load the page data once per nit, user and date range; the users index is built in the background
 @callback(
-    Output('status-dropdown', 'options'),
-    Output('status-dropdown', 'value'),
-    Output('total_signatures', 'children'),
-    Output('total_processes', 'children'),
-    Output('total_processes_signed', 'children'),
+    Output('consumption-store', 'data'),
+    Output('users-dropdown', 'options'),
+    Output('users-dropdown', 'className'),  # Add an output to control the dropdown's style
+    Output('drilldown-query', 'data'),
+    Output('data-as-of', 'children'),
+    Output('swr-interval', 'disabled'),
     Input('url', 'search'),
     Input('users-dropdown', 'value'),
     Input('date-picker-range', 'start_date'),
     Input('date-picker-range', 'end_date'),
 )
-def initial_data(search, user_filter, start_date, end_date,):
-    if search:
-        # Remove the leading '?' character from the search string
-        query_params = parse_qs(search[1:])
-        # Extract 'nit' parameter; returns a list, so use [0] to get the value
-        nit = query_params.get('nit', [None])[0]
-        user = query_params.get('user', [None])[0]
-    else:
-        nit = None
-        user = 0
-    
-    if user_filter and user_filter > 0:
-        user = user_filter
-
-    if start_date:
-        initial_start_date = start_date
-
-    if end_date:
-        current_date = end_date
-    
-    if nit:
-        # Prepare initial data for layout
-        get_consumptions_by_nit = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&initial_date={initial_start_date}&final_date={current_date}&&userAppId={user}'
-        token = authenticate()
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-        consumptions_by_nit = fetch_data(get_consumptions_by_nit, headers=headers)
-
-        logger.info(f'URL: -------{get_consumptions_by_nit}')
-            
-        json_data = consumptions_by_nit
-        print(json_data)
-        df = build_data_from_api(json_data)
-        total_signatures = get_total_signatures(json_data)
-        total_processes = get_total_processes(json_data)
-        total_processes_signed = get_total_processes_signed(json_data)
-
-        total_signatures_html = html.Div([
-            html.Span('Total de firmas'),
-            html.H3(f'{total_signatures}')
-        ])
-        
-        total_signatures_signed_html = html.Div([
-            html.Span('Total de procesos finalizados'),
-            html.H3(f'{total_processes_signed}')
-        ])
-
-        total_processes_html = html.Div([
-            html.Span("Total de procesos"),
-            html.H3(f"{total_processes}")
-        ])
-        
-        status_options = [{'label': status, 'value': status} for status in df['processStatus'].unique()]
-
-        default_value=df['processStatus'].unique()[4] if not df.empty else None  # Default value
-            
-        return status_options, default_value, total_signatures_html, total_processes_html, total_signatures_signed_html
-
-    return [], None
-
+def load_page_data(search, user_filter, start_date, end_date):
+    nit, user = parse_query(search)
+    if not nit:
+        print("No 'nit' parameter provided in the URL.")
+        return None, [], 'hidden-dropdown', None, '', True
 
-@callback(
-    Output('users-dropdown', 'options'),
-    Output('users-dropdown', 'className'),  # Add an output to control the dropdown's style
-    Input('url', 'search')  # 'search' contains the URL parameters
-)
-def display_users_by_nit(search):
-    # Extract the 'nit' parameter from the URL
-    if search:
-        # Remove the leading '?' character from the search string
-        query_params = parse_qs(search[1:])
-        # Extract 'nit' parameter; returns a list, so use [0] to get the value
-        nit = query_params.get('nit', [None])[0]
-        user = query_params.get('user', [None])[0]
-    else:
-        nit = None
-        user = None
-
-    if nit:
-        # Construct the get_users_by_nit URL using the extracted 'nit'
-        get_users_by_nit = f'{url}/api/v1/Company/GetAllUsersByNit/{nit}'
-
-        #Authenticate
-        token = authenticate()
-
-        headers = {
-            "Authorization": f"Bearer {token}"
-        }
-
-        # Fetch users by 'nit' using the constructed URL
-        users_by_nit_response = requests.get(get_users_by_nit, headers=headers)
-
-        if users_by_nit_response.status_code == 200:
-            users_by_nit = users_by_nit_response.json()
-
-            if user != '0':
-                dropdown_class = 'hidden-dropdown'
-                dropdown_options = []
-            else:
-                dropdown_class = 'show-dropdown'
-                # Create dropdown options from the users
-                dropdown_options = [{'label': user['fullName'], 'value': user['id']} for user in users_by_nit]
-            
-            return dropdown_options, dropdown_class
-        else:
-            return f"Failed to retrieve data: {users_by_nit_response.text}"
-    else:
-        return "No 'nit' parameter provided in the URL."
-
-# Callback to update the consolidado graph
-@callback(
-    Output('consolidado-graph', 'figure'),
-    Input('date-picker-range', 'start_date'),
-    Input('date-picker-range', 'end_date'),
-    Input('url', 'href'),  
-    Input('status-dropdown', 'value'),
-    Input('users-dropdown', 'value'),
-)
-def update_consolidado_graph(start_date, end_date, href, selected_status, user_filter):
-    nit = ''
-
-    if href:
-        parsed_url = urlparse(href)
-        query_params = parse_qs(parsed_url.query)
-        nit = query_params.get('nit', [None])[0]  # Get 'nit' from query parameters
-        user = query_params.get('user', [None])[0]  # Get 'user' from query parameters
-   
-    # API URL with dynamic dates
-    # api_url = f'{url}/api/v1/Balance/get-all-consumption?initial_date={start_date}&final_date={end_date}'
+    # A user fixed in the URL wins over the dropdown filter
     user_id = 0
     if user and int(user) > 0:
-        user_id = user
+        user_id = int(user)
     elif user_filter and user_filter > 0:
         user_id = user_filter
 
-    api_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&userAppId={user_id}&initial_date={start_date}&final_date={end_date}'
-    
-    # Access environment variables
-    email = os.getenv('EMAIL')
-    password = os.getenv('PASSWORD')
-
-    # Data for authentication
-    data = {
-        "email": email,
-        "password": password
-    }
-
-    # A POST request to the API
-    auth = f"{url}/api/v1/Auth/SignIn"
-    response = requests.post(auth, json=data)
-
-    if response.status_code != 200:
-        print(f"Authentication failed with status code {response.status_code}")
-        return px.bar(x=[], y=[], title="Error: Failed to authenticate")  # Return empty plot on auth failure
-
-    try:
-        res_json = response.json()
-        token = res_json['access_token']
-    except requests.exceptions.JSONDecodeError:
-        print("Failed to decode authentication response")
-        return px.bar(x=[], y=[], title="Error: Invalid auth response")  # Return empty plot on invalid auth response
-
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-
-    # Make API request to get data
-    consumptions = requests.get(api_url, headers=headers)
-    if consumptions.status_code != 200:
-        print(f"Failed to fetch consumption data with status code {consumptions.status_code}")
-        empty_df = pd.DataFrame({'x': [], 'y': []})
-        return px.bar(empty_df, x=[], y=[], title="Error: Failed to fetch data")  # Return empty plot on data fetch failure
-
-    try: 
-        json_data = consumptions.json() # Parse JSON response
-        # Convert the data into a pandas DataFrame
-        data = []
-        df = build_data_from_api(json_data)
-        df = df[df['processStatus'] != 'TODOS']
-
-        if (selected_status.lower() != 'todos'):
-            filtered_df = df[df['processStatus'] == selected_status]
-            df = filtered_df
-
-
-    except requests.exceptions.JSONDecodeError:
-        print("Failed to decode consumption data response")
-        return px.bar(
-            x=['Llamada', 'SMS', 'Email', 'WhatsApp'],
-            y=[0, 0, 0, 0],
-            labels={'x': 'Método', 'y': 'Total'},
-            title='Datos no encontrados',
-            text=[0, 0, 0, 0]
-        )
-
-    fig = px.bar(
-        df,
-        y='processStatus',
-        x='totalConsolidado',
-        orientation='h',
-        title='Procesos por estado',
-        labels={'processStatus': 'Estado', 'totalConsolidado': 'Total Consolidado'},
-        color='processStatus',
-        text='totalConsolidado'  # Display the total consolidado value on top of each bar
-    )
-
-    # Update the layout to position the text on top of each bar
-    fig.update_traces(textposition='inside')
-    
-    return fig
+    # Recently viewed NITs are refreshed in the background by data/warmer.py
+    track_view(nit, user_id)
 
-# Callback to update the tipoCreacion donut chart based on selected process status
-@callback(
-    Output('tipo-creacion-donut', 'figure'),
-    Input('date-picker-range', 'start_date'),
-    Input('date-picker-range', 'end_date'),
-    Input('url', 'href'),  
-    Input('status-dropdown', 'value'),
-    Input('users-dropdown', 'value'),
-)
-def update_tipo_creacion_donut(start_date, end_date, href, selected_status, user_filter):
-    nit = ''
-
-    if href:
-        parsed_url = urlparse(href)
-        query_params = parse_qs(parsed_url.query)
-        nit = query_params.get('nit', [None])[0]  # Get 'nit' from query parameters
-        user = query_params.get('user', [None])[0]  # Get 'user' from query parameters
-   
-    # API URL with dynamic dates
-    # api_url = f'{url}/api/v1/Balance/get-all-consumption?initial_date={start_date}&final_date={end_date}'
-    user_id = 0
-    if user and int(user) > 0:
-        user_id = user
-    elif user_filter and user_filter > 0:
-        user_id = user_filter
+    # The users dropdown only changes with the page; its options are searched as the user types
+    load_users = ctx.triggered_id in (None, 'url')
+    if load_users and user == '0':
+        # Build the search index in the background so the first search does not wait for the upstream;
+        # it runs in the callback's context, so it stops with the callback's upstream budget
+        get_executor().submit(contextvars.copy_context().run, get_user_index, nit)
 
-    token = authenticate()
-    if not token:
-        return px.bar(x=[], y=[], title="Error: Failed to authenticate")  # Empty plot on auth failure
+    with metrics.page_view('by_nit'):
+        if STALE_WHILE_REVALIDATE:
+            # Last known data at once; the interval picks up the refreshed data when it lands
+            json_data, fetched_at, revalidating = get_consumption_swr(nit, user_id, start_date, end_date)
+        else:
+            # Falls back to the last known data, labelled with its time, when the upstream cannot be reached
+            json_data, fetched_at = get_consumption_or_last_known(nit, user_id, start_date, end_date)
+            revalidating = False
 
-    headers = {"Authorization": f"Bearer {token}"}
-    api_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&initial_date={start_date}&final_date={end_date}&&userAppId={user_id}'
-    json_data = fetch_data(api_url, headers)
-    if not json_data:
-        empty_df = pd.DataFrame({'x': [], 'y': []})
-        return px.bar(empty_df, x='x', y='y', title="Error: Failed to fetch data")
+    logger.info(f'Consumption by nit: -------{nit} {start_date} {end_date} user={user_id}')
 
-    df = build_data_from_api(json_data)
-    return create_figure_from_data(df, selected_status, 'creation_type')
+    dataset = build_dataset(nit, json_data)
+    query = {'nit': nit, 'user_id': user_id, 'start_date': start_date, 'end_date': end_date, 'as_of': fetched_at, 'requested_at': time.time()}
+    as_of = format_as_of(fetched_at, revalidating)
+    if not load_users:
+        return dataset, no_update, no_update, query, as_of, not revalidating
 
+    return dataset, [], user_dropdown_class(user), query, as_of, not revalidating
 
-# Callback to update the tipoCreacion donut chart based on selected process status
+# Callback to swap in the refreshed data once the background refresh has stored it
 @callback(
-    Output('tipo-proceso-donut', 'figure'),
-    Input('date-picker-range', 'start_date'),
-    Input('date-picker-range', 'end_date'),
-    Input('url', 'href'),  
-    Input('status-dropdown', 'value'),
-    Input('users-dropdown', 'value'),
+    Output('consumption-store', 'data', allow_duplicate=True),
+    Output('drilldown-query', 'data', allow_duplicate=True),
+    Output('data-as-of', 'children', allow_duplicate=True),
+    Output('swr-interval', 'disabled', allow_duplicate=True),
+    Input('swr-interval', 'n_intervals'),
+    State('drilldown-query', 'data'),
+    prevent_initial_call=True,
 )
-def update_tipo_proceso_donut(start_date, end_date, href, selected_status, user_filter):
-    nit = ''
-
-    if href:
-        parsed_url = urlparse(href)
-        query_params = parse_qs(parsed_url.query)
-        nit = query_params.get('nit', [None])[0]  # Get 'nit' from query parameters
-        user = query_params.get('user', [None])[0]  # Get 'user' from query parameters
-   
-    # API URL with dynamic dates
-    # api_url = f'{url}/api/v1/Balance/get-all-consumption?initial_date={start_date}&final_date={end_date}'
-    user_id = 0
-    if user and int(user) > 0:
-        user_id = user
-    elif user_filter and user_filter > 0:
-        user_id = user_filter
+def refresh_stale_data(n_intervals, query):
+    if not query:
+        return no_update, no_update, no_update, True
 
-    token = authenticate()
-    if not token:
-        return px.bar(x=[], y=[], title="Error: Failed to authenticate")  # Empty plot on auth failure
+    json_data, fetched_at = get_last_known_consumption(query['nit'], query['user_id'], query['start_date'], query['end_date'])
+    if fetched_at and fetched_at > (query['as_of'] or 0):
+        return build_dataset(query['nit'], json_data), {**query, 'as_of': fetched_at}, format_as_of(fetched_at, False), True
 
-    headers = {"Authorization": f"Bearer {token}"}
-    api_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&initial_date={start_date}&final_date={end_date}&&userAppId={user_id}'
-    json_data = fetch_data(api_url, headers)
-    if not json_data:
-        empty_df = pd.DataFrame({'x': [], 'y': []})
-        return px.bar(empty_df, x='x', y='y', title="Error: Failed to fetch data")
+    # Give up polling once the refresh has had its whole deadline; the stale data stays
+    if time.time() - query['requested_at'] > UPSTREAM_FETCH_DEADLINE + 2 * SWR_POLL_INTERVAL:
+        return no_update, no_update, format_as_of(query['as_of'], False), True
+    raise PreventUpdate
 
-    df = build_data_from_api(json_data)
-    return create_figure_from_data(df, selected_status, 'process_type')
-    
-
-# Callback to update the consolidados graph
+# Callback to point the export links at the loaded nit, user and range
 @callback(
-    Output('consolidados', 'figure'),
-    # Output("consolidados", "children"),
-    Input('date-picker-range', 'start_date'),
-    Input('date-picker-range', 'end_date'),
-    Input('url', 'href'),  
-    Input('status-dropdown', 'value'),
-    Input('users-dropdown', 'value'),
+    [Output(f'export-{export_format}', 'href') for export_format in EXPORT_FORMATS],
+    Input('drilldown-query', 'data'),
 )
-def update_consolidados(start_date, end_date, href, selected_status, user_filter):
-    nit = ''
-
-    if href:
-        parsed_url = urlparse(href)
-        query_params = parse_qs(parsed_url.query)
-        nit = query_params.get('nit', [None])[0]  # Get 'nit' from query parameters
-        user = query_params.get('user', [None])[0]  # Get 'user' from query parameters
-   
-    # API URL with dynamic dates
-    # api_url = f'{url}/api/v1/Balance/get-all-consumption?initial_date={start_date}&final_date={end_date}'
-    user_id = 0
-    if user and int(user) > 0:
-        user_id = user
-    elif user_filter and user_filter > 0:
-        user_id = user_filter
-
-    token = authenticate()
-    if not token:
-        return px.bar(x=[], y=[], title="Error: Failed to authenticate")  # Empty plot on auth failure
+def update_export_links(query):
+    if not query:
+        return [None for _ in EXPORT_FORMATS]
+    params = urlencode({key: query[key] for key in ('nit', 'user_id', 'start_date', 'end_date')})
+    return [dash.get_relative_path(f'/export/consumption.{export_format}') + f'?{params}' for export_format in EXPORT_FORMATS]
 
-    headers = {"Authorization": f"Bearer {token}"}
-    api_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&userAppId={user_id}&initial_date={start_date}&final_date={end_date}'
-    json_data = fetch_data(api_url, headers)
-    if not json_data:
-        empty_df = pd.DataFrame({'x': [], 'y': []})
-        return px.bar(empty_df, x='x', y='y', title="Error: Failed to fetch data")
-
-    df = build_data_from_api(json_data)
-    return create_figure_from_data(df, selected_status, 'consolidated')
-
-
-# Callback to update the auth methods graph
+# Callback to search the users of the nit as the user types; only the top matches are sent
 @callback(
-    Output('auth-methods', 'figure'),
-    Input('date-picker-range', 'start_date'),
-    Input('date-picker-range', 'end_date'),
-    Input('url', 'href'),  
-    Input('status-dropdown', 'value'),
-    Input('users-dropdown', 'value'),
+    Output('users-dropdown', 'options', allow_duplicate=True),
+    Input('users-dropdown', 'search_value'),
+    State('url', 'search'),
+    State('users-dropdown', 'value'),
+    State('users-dropdown', 'options'),
+    prevent_initial_call=True,
 )
-def update_auth_methods(start_date, end_date, href, selected_status, user_filter): 
-    nit = ''
-
-    if href:
-        parsed_url = urlparse(href)
-        query_params = parse_qs(parsed_url.query)
-        nit = query_params.get('nit', [None])[0]  # Get 'nit' from query parameters
-        user = query_params.get('user', [None])[0]  # Get 'user' from query parameters
-   
-    # API URL with dynamic dates
-    user_id = 0
-    if user and int(user) > 0:
-        user_id = user
-    elif user_filter and user_filter > 0:
-        user_id = user_filter
+def search_user_options(search_value, search, selected_user, current_options):
+    nit, user = parse_query(search)
+    if not search_value or not nit or user != '0':
+        raise PreventUpdate
+
+    options = search_users(nit, search_value)
+    # Keep the selected user so the dropdown can still show its name
+    selected = [option for option in current_options or [] if option['value'] == selected_user]
+    if selected and all(option['value'] != selected_user for option in options):
+        options = selected + options
+    return options
+
+# Callback to fill the status filter from the loaded dataset
+def update_status_options(dataset, current_status):
+    if not dataset or not dataset['table'] or not dataset['table']['statuses']:
+        return [], None
+
+    statuses = dataset['table']['statuses']
+    status_options = [{'label': status, 'value': status} for status in statuses]
+
+    # Keep the selected status across reloads, otherwise fall back to the default one
+    if current_status in statuses:
+        return status_options, current_status
+    default_value = statuses[4] if len(statuses) > 4 else statuses[0]
+    return status_options, default_value
+
+# Callback to render the KPI tiles from the loaded dataset
+def update_totals(dataset):
+    table = table_from_columns(dataset['table'] if dataset and dataset['table'] else encode_consumption([]))
+
+    total_signatures_html = html.Div([
+        html.Span('Total de firmas'),
+        html.H3(f'{get_total_signatures(table)}')
+    ])
+
+    total_processes_html = html.Div([
+        html.Span("Total de procesos"),
+        html.H3(f"{get_total_processes(table)}")
+    ])
+
+    total_signatures_signed_html = html.Div([
+        html.Span('Total de procesos finalizados'),
+        html.H3(f'{get_total_processes_signed(table)}')
+    ])
+
+    return total_signatures_html, total_processes_html, total_signatures_signed_html
+
+# Callback to render the charts from the loaded dataset; status changes never hit the upstream
+def update_figures(dataset, selected_status):
+    if not dataset:
+        raise PreventUpdate
+
+    if not dataset['table'] or not selected_status:
+        fig = empty_figure("Error: Failed to fetch data")
+        return fig, fig, fig, fig, fig
+
+    table = table_from_columns(dataset['table'])
+    return (
+        create_figure_from_data(table, selected_status, 'consolidated'),
+        create_figure_from_data(table, selected_status, 'status_totals'),
+        create_figure_from_data(table, selected_status, 'process_type'),
+        create_figure_from_data(table, selected_status, 'creation_type'),
+        create_figure_from_data(table, selected_status, 'auth_method'),
+    )
 
-    token = authenticate()
-    if not token:
-        return px.bar(x=[], y=[], title="Error: Failed to authenticate")  # Empty plot on auth failure
+# With CLIENTSIDE_RENDERING a status change must not cost a request, so the drill-down then lists every
+# status and its Estado column filter narrows it; otherwise it follows the status filter
+drilldown_status = [] if CLIENTSIDE_RENDERING else [Input('status-dropdown', 'value')]
+
+# Callback to go back to the first page of the drill-down when anything but the page changes; it runs in the
+# browser and keeps page_current out of the outputs of update_drilldown, which reads it
+clientside_callback(
+    ClientsideFunction('by_nit', 'first_page'),
+    Output('drilldown-table', 'page_current'),
+    Input('drilldown-query', 'data'),
+    Input('drilldown-table', 'sort_by'),
+    Input('drilldown-table', 'filter_query'),
+    *drilldown_status,
+    prevent_initial_call=True,
+)
 
-    headers = {"Authorization": f"Bearer {token}"}
-    api_url = f'{url}/api/v1/Balance/get-all-consumption-by-nit?nit={nit}&initial_date={start_date}&final_date={end_date}&&userAppId={user_id}'
+# Callback to serve one page of the drill-down table for the filter, sort and (server rendering) selected status
+@callback(
+    Output('drilldown-table', 'data'),
+    Output('drilldown-table', 'page_count'),
+    Input('drilldown-query', 'data'),
+    Input('drilldown-table', 'page_current'),
+    Input('drilldown-table', 'page_size'),
+    Input('drilldown-table', 'sort_by'),
+    Input('drilldown-table', 'filter_query'),
+    *drilldown_status,
+)
+def update_drilldown(query, page_current, page_size, sort_by, filter_query, selected_status=None):
+    if not query:
+        return [], 1
 
-    json_data = fetch_data(api_url, headers)
-    if not json_data:
-        empty_df = pd.DataFrame({'x': [], 'y': []})
-        return px.bar(empty_df, x='x', y='y', title="Error: Failed to fetch data")
+    table = get_drilldown_table(query['nit'], query['user_id'], query['start_date'], query['end_date'], query.get('as_of'))
+    if table is None:
+        return [], 1
 
-    df = build_data_from_api(json_data)
-    return create_figure_from_data(df, selected_status, 'auth_method')
+    # Anything but a page change also resets page_current to 0 (first_page above), so this runs once with both
+    rows, page_count, _ = query_rows(table, selected_status, filter_query, sort_by, page_current, page_size or DRILLDOWN_PAGE_SIZE)
+    return rows, page_count
 
-   
+status_dependencies = [
+    Output('status-dropdown', 'options'),
+    Output('status-dropdown', 'value'),
+    Input('consumption-store', 'data'),
+    State('status-dropdown', 'value'),
+]
+totals_dependencies = [
+    Output('total_signatures', 'children'),
+    Output('total_processes', 'children'),
+    Output('total_processes_signed', 'children'),
+    Input('consumption-store', 'data'),
+]
+figures_dependencies = [
+    Output('consolidados', 'figure'),
+    Output('consolidado-graph', 'figure'),
+    Output('tipo-proceso-donut', 'figure'),
+    Output('tipo-creacion-donut', 'figure'),
+    Output('auth-methods', 'figure'),
+    Input('consumption-store', 'data'),
+    Input('status-dropdown', 'value'),
+]
+
+if CLIENTSIDE_RENDERING:
+    # The browser renders from the stored dataset (assets/by_nit.js), so status changes cost no request
+    clientside_callback(ClientsideFunction('by_nit', 'status_options'), *status_dependencies)
+    clientside_callback(ClientsideFunction('by_nit', 'totals'), *totals_dependencies)
+    clientside_callback(ClientsideFunction('by_nit', 'figures'), *figures_dependencies, State('figure-template', 'data'))
+else:
+    callback(*status_dependencies)(update_status_options)
+    callback(*totals_dependencies)(update_totals)
+    callback(*figures_dependencies)(update_figures)
@@ -0,0 +1,113 @@
+# Import packages
+import dash
+from dash import dcc, html, callback
+from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
+from datetime import datetime, timedelta
+import logging
+
+# Local import (plotly is imported where used so worker boot stays light)
+from data import metrics
+from data.compare import COMPARE_MAX_NITS, get_comparison, parse_nits
+from data.consumption import bogota_tz
+from data.figures import create_compare_monthly_figure, create_compare_totals_figure, empty_figure
+
+logger = logging.getLogger(__name__)
+
+# Set date range
+current_date = datetime.now(bogota_tz).date()
+initial_start_date = (current_date - timedelta(days=30)).strftime('%Y-%m-%d')
+initial_end_date = current_date.strftime('%Y-%m-%d')
+
+# Register page
+dash.register_page(__name__)
+
+box_style = {'background': '#fff', 'display': 'inline-block', 'border': '1px solid #ccc'}
+
+
+# Layout; the NITs can be given in the URL, e.g. /compare?nits=900123,900456
+def layout(nits='', **kwargs):
+    return html.Div([
+        html.Div([
+            html.H1('Comparar NIT', style={'color': '#173179', 'text-transform': 'uppercase', 'text-align': 'left', 'margin': '0', 'font-size': '22px', 'flex-grow': '1'}),
+            html.Div([
+                html.Span(f'NIT (hasta {COMPARE_MAX_NITS}, separados por coma)', className='filter_label'),
+                # Debounced so the NITs are only fetched on Enter or when the field loses focus
+                dcc.Input(id='compare-nits', type='text', value=nits, debounce=True, style={'height': '36px', 'width': '400px'}),
+            ], style={'display': 'flex', 'flex-direction': 'column'}),
+            html.Div([
+                html.Span('Fecha', className='filter_label'),
+                dcc.DatePickerRange(
+                    id='compare-date-range',
+                    start_date=initial_start_date,
+                    end_date=initial_end_date,
+                    max_date_allowed=current_date,
+                    display_format='YYYY-MM-DD',
+                ),
+            ], style={'display': 'flex', 'flex-direction': 'column'}),
+            html.Div([
+                html.Span('Escala', className='filter_label'),
+                dcc.RadioItems(
+                    id='compare-scale',
+                    options=[{'label': 'Totales', 'value': 'absolute'}, {'label': 'Normalizado (%)', 'value': 'normalized'}],
+                    value='absolute',
+                ),
+            ], style={'display': 'flex', 'flex-direction': 'column'}),
+        ], style={'display': 'flex', 'justify-content': 'flex-end', 'column-gap': '20px', 'margin-top': '20px', 'margin-bottom': '20px'}),
+
+        html.Div(id='compare-failed', style={'color': '#b00020', 'margin-bottom': '10px'}),
+
+        html.Div([
+            html.Div([
+                dcc.Loading(type="dot", children=dcc.Graph(id='compare-totals', style={'height': '450px'})),
+            ], style={**box_style, 'width': '100%'}),
+        ], className="box"),
+
+        html.Div([
+            html.Div([
+                dcc.Loading(type="dot", children=dcc.Graph(id='compare-monthly', style={'height': '450px'})),
+            ], style={**box_style, 'width': '100%'}),
+        ], className="box"),
+
+        # Per-NIT totals of the comparison; the scale switch re-renders from it without fetching
+        dcc.Store(id='compare-store'),
+    ])
+
+# Callback to fetch the consumption of every NIT concurrently, sharing one token and connection pool
+@callback(
+    Output('compare-store', 'data'),
+    Input('compare-nits', 'value'),
+    Input('compare-date-range', 'start_date'),
+    Input('compare-date-range', 'end_date'),
+)
+def load_comparison(nits_text, start_date, end_date):
+    nits = parse_nits(nits_text)
+    if not nits or not start_date or not end_date:
+        raise PreventUpdate
+
+    with metrics.page_view('compare'):
+        summaries, failed = get_comparison(nits, start_date, end_date)
+
+    logger.info(f'Comparison: {len(nits)} NITs {start_date} {end_date} failed={failed}')
+    return {'summaries': summaries, 'failed': failed}
+
+# Callback to render the comparison charts, in totals or normalized
+@callback(
+    Output('compare-failed', 'children'),
+    Output('compare-totals', 'figure'),
+    Output('compare-monthly', 'figure'),
+    Input('compare-store', 'data'),
+    Input('compare-scale', 'value'),
+)
+def update_comparison(data, scale):
+    if not data:
+        raise PreventUpdate
+
+    failed = f"Error: Failed to fetch data for {', '.join(data['failed'])}" if data['failed'] else ''
+    summaries = data['summaries']
+    if not summaries:
+        fig = empty_figure("Error: Failed to fetch data")
+        return failed, fig, fig
+
+    normalized = scale == 'normalized'
+    return failed, create_compare_totals_figure(summaries, normalized), create_compare_monthly_figure(summaries, normalized)